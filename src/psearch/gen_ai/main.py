@@ -90,6 +90,12 @@ sql_fix_service = SQLFixService(project_id, location)
 # transformation_pipeline = TransformationPipeline(project_id, location)
 
 
+@app.on_event("shutdown")
+async def close_services():
+    """Release connections held by the shared services"""
+    await enrichment_service.aclose()
+
+
 # Define request models
 class ConversationalSearchRequest(BaseModel):
     query: str
@@ -104,6 +110,16 @@ class EnrichmentRequest(BaseModel):
     fields_to_enrich: Optional[List[str]] = None
 
 
+class EnrichmentBatchItem(BaseModel):
+    product_id: str
+    product_data: Dict[str, Any]
+
+
+class EnrichmentBatchRequest(BaseModel):
+    products: List[EnrichmentBatchItem]
+    fields_to_enrich: Optional[List[str]] = None
+
+
 class MarketingRequest(BaseModel):
     product_id: str
     product_data: Dict[str, Any]
@@ -335,15 +351,15 @@ async def enrichment(request: EnrichmentRequest):
         logger.info(f"Product has {len(request.product_data['images'])} images")
 
     try:
-        result = enrichment_service.process_enrichment(
+        result = await enrichment_service.process_enrichment_async(
             product_id=request.product_id,
             product_data=request.product_data,
             fields_to_enrich=request.fields_to_enrich,
         )
 
         # Log the enriched fields for debugging
-        logger.info(f"Enrichment completed for product: {request.product_id}")
-        if "enriched_fields" in result:
+        logger.info("Enrichment completed for product: %s", request.product_id)
+        if "enriched_fields" in result and logger.isEnabledFor(logging.INFO):
             for field, content in result["enriched_fields"].items():
                 # Handle different content types safely
                 if isinstance(content, str):
@@ -373,6 +389,32 @@ async def enrichment(request: EnrichmentRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/enrichment/batch", tags=["Enrichment"])
+async def enrichment_batch(request: EnrichmentBatchRequest):
+    """
+    Enrich several products, sharing model calls between them
+    """
+    logger.info(f"Received batch enrichment request for {len(request.products)} products")
+    logger.info(f"Fields to enrich: {request.fields_to_enrich}")
+
+    try:
+        results = await enrichment_service.process_enrichment_batch_async(
+            products=[product.model_dump() for product in request.products],
+            fields_to_enrich=request.fields_to_enrich,
+        )
+
+        failed = sum(1 for result in results if "error" in result["enriched_fields"])
+        logger.info(
+            f"Batch enrichment completed: {len(results) - failed} succeeded, {failed} failed"
+        )
+
+        return {"results": results}
+
+    except Exception as e:
+        logger.error(f"Error processing batch enrichment: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/marketing", tags=["Marketing"])
 async def marketing(request: MarketingRequest):
     """
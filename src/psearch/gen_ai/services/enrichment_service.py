@@ -19,8 +19,13 @@ Enrichment Service - Enhances product data with AI-generated content
 
 from google import genai
 from google.genai import types
+import asyncio
+import hashlib
+import httpx
 import logging
+import threading
 import requests
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional
 import json
 import base64
@@ -28,6 +33,100 @@ from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt or response schema changes so cached results are not reused
+PROMPT_VERSION = "2"
+
+# Maximum number of enrichment results kept in memory
+CACHE_MAX_ENTRIES = 4096
+
+# Maximum number of downloaded product images kept in memory
+IMAGE_CACHE_MAX_ENTRIES = 256
+
+# Number of products packed into one model call by the batch enrichment path
+ENRICHMENT_BATCH_SIZE = 4
+
+# Batched model calls in flight at once; later chunks wait so their prompts
+# and images are not all held in memory together
+ENRICHMENT_MAX_CONCURRENT_CHUNKS = 16
+
+# Seconds to wait for a product image download
+IMAGE_FETCH_TIMEOUT = 10
+
+# Connections kept open to each upstream. httpx keeps only 20 alive by
+# default, so concurrent enrichments beyond that would keep reconnecting
+HTTP_POOL_SIZE = 64
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE
+)
+
+# Input-independent instructions, sent as the system instruction so every
+# request shares the same prefix
+ENRICHMENT_INSTRUCTION = """
+You are a product content specialist with expertise in enhancing product information with engaging, 
+accurate, and SEO-friendly content. Your task is to enrich product data with high-quality content.
+
+For each field requested, create content that is:
+1. Engaging and persuasive to potential customers
+2. Factually accurate based on the product data provided
+3. Well-structured and professionally written
+4. SEO-optimized with relevant keywords
+
+Your response should be in JSON format with the following structure:
+{
+    "field_name_1": "Enhanced content for field 1",
+    "field_name_2": "Enhanced content for field 2",
+    ...
+}
+
+For different field types:
+- "description": Create a compelling product description (250-300 words)
+- "features": List 5-8 key product features with brief explanations
+- "benefits": Describe 3-5 benefits of using this product
+- "use_cases": Provide 3-4 practical use cases or scenarios
+- "technical_specs": Format technical specifications as key-value pairs, making informed inferences based on the product data.
+  You MUST include all the following properties in your response:
+  "technical_specs": {
+    "Material": "Describe the main materials used (e.g., 'Premium cotton blend', 'Stainless steel')",
+    "Color": "Describe the color in detail (e.g., 'Deep navy blue', 'Vibrant crimson')",
+    "Dimensions": "Provide measurements (e.g., '30cm x 20cm x 5cm', 'Standard fit')",
+    "Weight": "Describe the weight (e.g., '250g', 'Lightweight')",
+    "Style": "Describe the style (e.g., 'Contemporary', 'Vintage', 'Sporty')",
+    "Brand": "The brand name from the product data",
+    "Category": "The product category from the product data"
+  }
+
+  Even if you don't have exact information for a field, use the product context to make a reasonable inference
+  rather than saying "Not specified" or leaving fields empty. Use visual cues from any product images provided.
+
+Pay close attention to the product image provided and use visual information to enrich your content. 
+Include specific details visible in the image such as color, design features, materials, and overall 
+appearance in your descriptions.
+
+Only include the fields that were requested in the output.
+"""
+
+# Per-request prompt text; only the product data and field list vary
+PRODUCT_PROMPT_TEMPLATE = (
+    "Product Data:\n%(product_data)s"
+    "\n\nFields to enrich:\n%(fields)s"
+    "\n\nPlease provide your response in the specified JSON format."
+)
+BATCH_PRODUCT_PROMPT_TEMPLATE = (
+    "=== PRODUCT %(number)d ===\nProduct Data:\n%(product_data)s"
+)
+BATCH_FIELDS_PROMPT_TEMPLATE = (
+    "Fields to enrich:\n%(fields)s"
+    "\n\nRespond with a JSON array of exactly %(count)d objects, one per product "
+    "in the order given, each in the specified JSON format."
+)
+
+SAFETY_SETTINGS = [
+    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+]
+
 
 class EnrichmentService:
     def __init__(self, project_id: str, location: str):
@@ -37,8 +136,32 @@ class EnrichmentService:
             vertexai=True,
             project=project_id,
             location=location,
+            http_options=types.HttpOptions(
+                client_args={"limits": HTTP_POOL_LIMITS},
+                async_client_args={"limits": HTTP_POOL_LIMITS},
+            ),
         )
+        logger.info("Gemini client connection pool size: %d", HTTP_POOL_SIZE)
         self.model = "gemini-2.0-flash-001"
+        # Enriched fields keyed by a hash of the model, prompt version and inputs
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Image parts keyed by URL, since product variants often share one image
+        self._image_parts: "OrderedDict[str, types.Part]" = OrderedDict()
+        self._image_parts_lock = threading.Lock()
+        # Shared HTTP clients for image downloads, so repeated fetches from the
+        # same host reuse kept-alive connections instead of new TLS handshakes
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        # The async client is created on first use
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # Generation configs keyed by the requested fields and whether the
+        # response is batched; they never change
+        self._configs: Dict[tuple, types.GenerateContentConfig] = {}
 
     def process_enrichment(
         self,
@@ -57,8 +180,261 @@ class EnrichmentService:
         Returns:
             Dictionary with product_id and enriched_fields
         """
-        logger.info(f"Processing enrichment for product {product_id}")
+        logger.info("Processing enrichment for product %s", product_id)
+
+        fields_to_enrich = self._resolve_fields(fields_to_enrich)
+
+        # Unchanged products skip the model call entirely
+        cache_key = self._cache_key(product_data, fields_to_enrich)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return {"product_id": product_id, "enriched_fields": cached}
+
+        # Build prompt with product data and fields to enrich
+        prompt = self._build_prompt(product_data, fields_to_enrich)
+        generate_content_config = self._build_generation_config(fields_to_enrich)
+
+        try:
+            # Call Gemini model
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=generate_content_config,
+            )
+
+            # Parse the response
+            enriched_fields = self._parse_response(response.text, fields_to_enrich)
+            self._cache_put(cache_key, enriched_fields)
+
+            return {"product_id": product_id, "enriched_fields": enriched_fields}
+
+        except Exception as e:
+            return self._error_result(product_id, e)
+
+    async def process_enrichment_async(
+        self,
+        product_id: str,
+        product_data: Dict[str, Any],
+        fields_to_enrich: Optional[List[str]] = None,
+    ) -> Dict:
+        """
+        Enrich product data with AI-generated content without blocking the event loop
+
+        Uses the client's native async API, so many enrichments can be in flight
+        on one event loop instead of holding a thread each.
+
+        Args:
+            product_id: ID of the product to enrich
+            product_data: Dictionary containing product data
+            fields_to_enrich: List of fields to enrich (defaults to standard set)
+
+        Returns:
+            Dictionary with product_id and enriched_fields
+        """
+        logger.info("Processing enrichment for product %s", product_id)
+
+        fields_to_enrich = self._resolve_fields(fields_to_enrich)
+
+        cache_key = self._cache_key(product_data, fields_to_enrich)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return {"product_id": product_id, "enriched_fields": cached}
+
+        prompt = await self._build_prompt_async(product_data, fields_to_enrich)
+        generate_content_config = self._build_generation_config(fields_to_enrich)
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=generate_content_config,
+            )
+
+            enriched_fields = self._parse_response(response.text, fields_to_enrich)
+            self._cache_put(cache_key, enriched_fields)
+
+            return {"product_id": product_id, "enriched_fields": enriched_fields}
+
+        except Exception as e:
+            return self._error_result(product_id, e)
+
+    async def aclose(self) -> None:
+        """Close the HTTP connections used for image downloads"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._session.close()
+
+    async def process_enrichment_batch_async(
+        self,
+        products: List[Dict[str, Any]],
+        fields_to_enrich: Optional[List[str]] = None,
+        batch_size: int = ENRICHMENT_BATCH_SIZE,
+    ) -> List[Dict]:
+        """
+        Enrich several products, packing up to batch_size of them into each model call
+
+        Args:
+            products: Dictionaries with product_id and product_data
+            fields_to_enrich: List of fields to enrich for every product
+            batch_size: Maximum number of products per model call
+
+        Returns:
+            One dictionary with product_id and enriched_fields per product, in order
+        """
+        logger.info("Processing batch enrichment for %d products", len(products))
+
+        fields_to_enrich = self._resolve_fields(fields_to_enrich)
+
+        results: List[Optional[Dict]] = [None] * len(products)
+        pending = []
+        for index, product in enumerate(products):
+            cache_key = self._cache_key(product["product_data"], fields_to_enrich)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                results[index] = {
+                    "product_id": product["product_id"],
+                    "enriched_fields": cached,
+                }
+            else:
+                pending.append((index, cache_key, product))
+
+        chunks = [
+            pending[start : start + batch_size]
+            for start in range(0, len(pending), batch_size)
+        ]
+        semaphore = asyncio.Semaphore(ENRICHMENT_MAX_CONCURRENT_CHUNKS)
+
+        async def enrich(chunk):
+            async with semaphore:
+                return chunk, await self._enrich_chunk_async(chunk, fields_to_enrich)
+
+        # Collect each chunk as soon as it finishes, so one slow call does not
+        # hold back the bookkeeping for the rest
+        for finished in asyncio.as_completed([enrich(chunk) for chunk in chunks]):
+            chunk, enriched = await finished
+            for (index, _, _), result in zip(chunk, enriched):
+                results[index] = result
+            logger.info("Enriched %d products in batch", len(chunk))
+
+        return results
+
+    async def _enrich_chunk_async(
+        self, chunk: List[tuple], fields_to_enrich: List[str]
+    ) -> List[Dict]:
+        """Enrich one chunk of products with a single model call"""
+        if len(chunk) == 1:
+            _, _, product = chunk[0]
+            return [
+                await self.process_enrichment_async(
+                    product["product_id"], product["product_data"], fields_to_enrich
+                )
+            ]
+
+        product_datas = [product["product_data"] for _, _, product in chunk]
+        image_urls = [self._product_image_url(data) for data in product_datas]
+        image_parts = await asyncio.gather(
+            *(self._get_image_part_async(url) for url in image_urls if url)
+        )
+        image_parts = iter(image_parts)
+
+        parts = []
+        for number, (data, image_url) in enumerate(zip(product_datas, image_urls), 1):
+            image_part = next(image_parts) if image_url else None
+            parts.append(
+                types.Part.from_text(
+                    text=BATCH_PRODUCT_PROMPT_TEMPLATE
+                    % {"number": number, "product_data": json.dumps(data, indent=2)}
+                )
+            )
+            if image_part:
+                parts.append(image_part)
+        parts.append(
+            types.Part.from_text(
+                text=BATCH_FIELDS_PROMPT_TEMPLATE
+                % {"fields": ", ".join(fields_to_enrich), "count": len(chunk)}
+            )
+        )
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=[types.Content(role="user", parts=parts)],
+                config=self._build_generation_config(fields_to_enrich, batched=True),
+            )
+            items = json.loads(response.text)
+            if not isinstance(items, list) or len(items) != len(chunk):
+                raise ValueError(
+                    f"Expected {len(chunk)} results, got "
+                    f"{len(items) if isinstance(items, list) else type(items).__name__}"
+                )
+        except Exception as e:
+            # Only the products of this chunk are retried, one call each
+            logger.warning(
+                f"Batched enrichment failed, enriching individually: {str(e)}"
+            )
+            return list(
+                await asyncio.gather(
+                    *(
+                        self.process_enrichment_async(
+                            product["product_id"],
+                            product["product_data"],
+                            fields_to_enrich,
+                        )
+                        for _, _, product in chunk
+                    )
+                )
+            )
+
+        results = []
+        for (_, cache_key, product), item in zip(chunk, items):
+            enriched_fields = self._parse_response(json.dumps(item), fields_to_enrich)
+            self._cache_put(cache_key, enriched_fields)
+            results.append(
+                {
+                    "product_id": product["product_id"],
+                    "enriched_fields": enriched_fields,
+                }
+            )
+        return results
 
+    def _cache_key(
+        self, product_data: Dict[str, Any], fields_to_enrich: List[str]
+    ) -> str:
+        """Deterministic key for an enrichment request"""
+        canonical = json.dumps(
+            {
+                "m": self.model,
+                "v": PROMPT_VERSION,
+                "p": product_data,
+                "f": fields_to_enrich,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return cached enriched fields, refreshing their recency"""
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                logger.info("Using cached enrichment result")
+            return cached
+
+    def _cache_put(self, cache_key: str, enriched_fields: Dict[str, Any]) -> None:
+        """Cache successfully parsed enriched fields, evicting the oldest entry when full"""
+        if "error" in enriched_fields:
+            return
+        with self._cache_lock:
+            self._cache[cache_key] = enriched_fields
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > CACHE_MAX_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def _resolve_fields(self, fields_to_enrich: Optional[List[str]]) -> List[str]:
+        """Return the requested fields, or the default set if none were given"""
         # If no fields specified, use default set
         if not fields_to_enrich:
             fields_to_enrich = [
@@ -68,10 +444,24 @@ class EnrichmentService:
                 "use_cases",
                 "technical_specs",
             ]
+        return fields_to_enrich
+
+    def _build_generation_config(
+        self, fields_to_enrich: List[str], batched: bool = False
+    ) -> types.GenerateContentConfig:
+        """Return the structured-output generation config for the requested fields"""
+        key = (tuple(fields_to_enrich), batched)
+        config = self._configs.get(key)
+        if config is None:
+            config = self._configs[key] = self._new_generation_config(
+                fields_to_enrich, batched
+            )
+        return config
 
-        # Build prompt with product data and fields to enrich
-        prompt = self._build_prompt(product_data, fields_to_enrich)
-
+    def _new_generation_config(
+        self, fields_to_enrich: List[str], batched: bool = False
+    ) -> types.GenerateContentConfig:
+        """Build the structured-output generation config for the requested fields"""
         # Create response schema for enriched fields
         response_schema = {"type": "OBJECT", "properties": {}}
 
@@ -99,67 +489,71 @@ class EnrichmentService:
                 # For other fields like description, features, etc.
                 response_schema["properties"][field] = {"type": "STRING"}
 
+        max_output_tokens = 4096
+        if batched:
+            # One object per product, with room for several products' content
+            response_schema = {"type": "ARRAY", "items": response_schema}
+            max_output_tokens = 8192
+
         # Set up generation configuration with structured JSON output
-        generate_content_config = types.GenerateContentConfig(
+        return types.GenerateContentConfig(
             temperature=0.7,  # Higher temperature for more creative responses
             top_p=0.95,
-            max_output_tokens=4096,
+            max_output_tokens=max_output_tokens,
             response_modalities=["TEXT"],
             response_mime_type="application/json",
             response_schema=response_schema,
-            safety_settings=[
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HARASSMENT", threshold="OFF"
-                ),
-            ],
+            system_instruction=ENRICHMENT_INSTRUCTION,
+            safety_settings=SAFETY_SETTINGS,
         )
 
-        try:
-            # Call Gemini model
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=generate_content_config,
-            )
-
-            # Parse the response
-            enriched_fields = self._parse_response(response.text, fields_to_enrich)
+    def _error_result(self, product_id: str, error: Exception) -> Dict:
+        """Build the result returned when content generation fails"""
+        logger.error(f"Error generating enriched content: {str(error)}")
+        return {
+            "product_id": product_id,
+            "enriched_fields": {
+                "error": f"Error generating enriched content: {str(error)}"
+            },
+        }
 
-            return {"product_id": product_id, "enriched_fields": enriched_fields}
+    def _image_fetch_url(self, image_url: str) -> str:
+        """Return the HTTP URL an image can be downloaded from"""
+        # Handle different URL formats (especially for Google Cloud Storage)
+        parsed_url = urlparse(image_url)
 
-        except Exception as e:
-            logger.error(f"Error generating enriched content: {str(e)}")
-            return {
-                "product_id": product_id,
-                "enriched_fields": {
-                    "error": f"Error generating enriched content: {str(e)}"
-                },
-            }
+        # If it's a GCS URL (gs://), convert it to HTTPS
+        if parsed_url.scheme == "gs":
+            bucket = parsed_url.netloc
+            object_path = parsed_url.path.lstrip("/")
+            return f"https://storage.googleapis.com/{bucket}/{object_path}"
+        return image_url
 
     def _get_image_bytes_from_url(self, image_url: str) -> Optional[bytes]:
         """Fetch image bytes from URL"""
         try:
-            # Handle different URL formats (especially for Google Cloud Storage)
-            parsed_url = urlparse(image_url)
-
-            # If it's a GCS URL (gs://), convert it to HTTPS
-            if parsed_url.scheme == "gs":
-                bucket = parsed_url.netloc
-                object_path = parsed_url.path.lstrip("/")
-                url = f"https://storage.googleapis.com/{bucket}/{object_path}"
+            url = self._image_fetch_url(image_url)
+            response = self._session.get(url, timeout=IMAGE_FETCH_TIMEOUT)
+            if response.status_code == 200:
+                return response.content
             else:
-                url = image_url
+                logger.warning(
+                    f"Failed to fetch image from {url}: {response.status_code}"
+                )
+                return None
+        except Exception as e:
+            logger.warning(f"Error fetching image from {image_url}: {str(e)}")
+            return None
 
-            response = requests.get(url, timeout=10)
+    async def _get_image_bytes_from_url_async(self, image_url: str) -> Optional[bytes]:
+        """Fetch image bytes from URL without blocking the event loop"""
+        try:
+            url = self._image_fetch_url(image_url)
+            if self._http_client is None:
+                self._http_client = httpx.AsyncClient(
+                    timeout=IMAGE_FETCH_TIMEOUT, limits=HTTP_POOL_LIMITS
+                )
+            response = await self._http_client.get(url)
             if response.status_code == 200:
                 return response.content
             else:
@@ -171,94 +565,112 @@ class EnrichmentService:
             logger.warning(f"Error fetching image from {image_url}: {str(e)}")
             return None
 
-    def _build_prompt(
-        self, product_data: Dict[str, Any], fields_to_enrich: List[str]
-    ) -> List[types.Content]:
-        """Build the prompt for the Gemini model"""
-
-        instruction = """
-        You are a product content specialist with expertise in enhancing product information with engaging, 
-        accurate, and SEO-friendly content. Your task is to enrich product data with high-quality content.
-
-        For each field requested, create content that is:
-        1. Engaging and persuasive to potential customers
-        2. Factually accurate based on the product data provided
-        3. Well-structured and professionally written
-        4. SEO-optimized with relevant keywords
-        
-        Your response should be in JSON format with the following structure:
-        {
-            "field_name_1": "Enhanced content for field 1",
-            "field_name_2": "Enhanced content for field 2",
-            ...
-        }
-        
-        For different field types:
-        - "description": Create a compelling product description (250-300 words)
-        - "features": List 5-8 key product features with brief explanations
-        - "benefits": Describe 3-5 benefits of using this product
-        - "use_cases": Provide 3-4 practical use cases or scenarios
-        - "technical_specs": Format technical specifications as key-value pairs, making informed inferences based on the product data.
-          You MUST include all the following properties in your response:
-          "technical_specs": {
-            "Material": "Describe the main materials used (e.g., 'Premium cotton blend', 'Stainless steel')",
-            "Color": "Describe the color in detail (e.g., 'Deep navy blue', 'Vibrant crimson')",
-            "Dimensions": "Provide measurements (e.g., '30cm x 20cm x 5cm', 'Standard fit')",
-            "Weight": "Describe the weight (e.g., '250g', 'Lightweight')",
-            "Style": "Describe the style (e.g., 'Contemporary', 'Vintage', 'Sporty')",
-            "Brand": "The brand name from the product data",
-            "Category": "The product category from the product data"
-          }
-          
-          Even if you don't have exact information for a field, use the product context to make a reasonable inference
-          rather than saying "Not specified" or leaving fields empty. Use visual cues from any product images provided.
-        
-        Pay close attention to the product image provided and use visual information to enrich your content. 
-        Include specific details visible in the image such as color, design features, materials, and overall 
-        appearance in your descriptions.
-        
-        Only include the fields that were requested in the output.
-        """
+    def _cached_image_part(self, image_url: str) -> Optional[types.Part]:
+        """Return the previously downloaded image part for the URL, if any"""
+        with self._image_parts_lock:
+            image_part = self._image_parts.get(image_url)
+            if image_part is not None:
+                self._image_parts.move_to_end(image_url)
+            return image_part
+
+    def _store_image_part(self, image_url: str, image_bytes: bytes) -> types.Part:
+        """Wrap downloaded image bytes in a prompt part and cache it by URL"""
+        # Determine MIME type based on file extension
+        if image_url.lower().endswith(".png"):
+            mime_type = "image/png"
+        elif image_url.lower().endswith((".jpg", ".jpeg")):
+            mime_type = "image/jpeg"
+        elif image_url.lower().endswith(".gif"):
+            mime_type = "image/gif"
+        else:
+            mime_type = "image/jpeg"  # Default to JPEG
+
+        image_part = types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+        with self._image_parts_lock:
+            self._image_parts[image_url] = image_part
+            self._image_parts.move_to_end(image_url)
+            if len(self._image_parts) > IMAGE_CACHE_MAX_ENTRIES:
+                self._image_parts.popitem(last=False)
+        return image_part
+
+    def _get_image_part(self, image_url: str) -> Optional[types.Part]:
+        """Return the image at the URL as a prompt part, downloading it only once"""
+        image_part = self._cached_image_part(image_url)
+        if image_part is not None:
+            return image_part
+
+        image_bytes = self._get_image_bytes_from_url(image_url)
+        if not image_bytes:
+            return None
+        return self._store_image_part(image_url, image_bytes)
 
-        user_prompt = f"{instruction}\n\nProduct Data:\n"
-        user_prompt += json.dumps(product_data, indent=2)
-        user_prompt += "\n\nFields to enrich:\n"
-        user_prompt += ", ".join(fields_to_enrich)
-        user_prompt += "\n\nPlease provide your response in the specified JSON format."
+    async def _get_image_part_async(self, image_url: str) -> Optional[types.Part]:
+        """Async variant of _get_image_part"""
+        image_part = self._cached_image_part(image_url)
+        if image_part is not None:
+            return image_part
 
-        parts = [types.Part.from_text(text=user_prompt)]
+        image_bytes = await self._get_image_bytes_from_url_async(image_url)
+        if not image_bytes:
+            return None
+        return self._store_image_part(image_url, image_bytes)
 
-        # Try to get the product image and include it in the prompt
+    def _product_image_url(self, product_data: Dict[str, Any]) -> Optional[str]:
+        """Return the URI of the product's first image, if it has one"""
         try:
             if product_data.get("images") and len(product_data["images"]) > 0:
                 image_url = product_data["images"][0].get("uri")
                 if image_url:
-                    image_bytes = self._get_image_bytes_from_url(image_url)
-                    if image_bytes:
-                        # Determine MIME type based on file extension
-                        if image_url.lower().endswith(".png"):
-                            mime_type = "image/png"
-                        elif image_url.lower().endswith((".jpg", ".jpeg")):
-                            mime_type = "image/jpeg"
-                        elif image_url.lower().endswith(".gif"):
-                            mime_type = "image/gif"
-                        else:
-                            mime_type = "image/jpeg"  # Default to JPEG
-
-                        # Add image part to the prompt
-                        image_part = types.Part.from_bytes(
-                            data=image_bytes, mime_type=mime_type
-                        )
-                        parts.append(image_part)
-                        logger.info(f"Added image from {image_url} to the prompt")
-                    else:
-                        logger.warning(f"Could not fetch image bytes from {image_url}")
-                else:
-                    logger.warning("Product has images but no URI found")
+                    return image_url
+                logger.warning("Product has images but no URI found")
             else:
                 logger.info("No product images found")
         except Exception as e:
             logger.warning(f"Error adding image to prompt: {str(e)}")
+        return None
+
+    def _build_prompt(
+        self, product_data: Dict[str, Any], fields_to_enrich: List[str]
+    ) -> List[types.Content]:
+        """Build the prompt for the Gemini model"""
+        image_url = self._product_image_url(product_data)
+        image_part = self._get_image_part(image_url) if image_url else None
+        return self._assemble_prompt(
+            product_data, fields_to_enrich, image_url, image_part
+        )
+
+    async def _build_prompt_async(
+        self, product_data: Dict[str, Any], fields_to_enrich: List[str]
+    ) -> List[types.Content]:
+        """Build the prompt for the Gemini model, fetching the image asynchronously"""
+        image_url = self._product_image_url(product_data)
+        image_part = await self._get_image_part_async(image_url) if image_url else None
+        return self._assemble_prompt(
+            product_data, fields_to_enrich, image_url, image_part
+        )
+
+    def _assemble_prompt(
+        self,
+        product_data: Dict[str, Any],
+        fields_to_enrich: List[str],
+        image_url: Optional[str],
+        image_part: Optional[types.Part],
+    ) -> List[types.Content]:
+        """Combine the product data and the optional image into prompt contents"""
+        user_prompt = PRODUCT_PROMPT_TEMPLATE % {
+            "product_data": json.dumps(product_data, indent=2),
+            "fields": ", ".join(fields_to_enrich),
+        }
+
+        parts = [types.Part.from_text(text=user_prompt)]
+
+        # Unreachable images fall back to a text-only prompt
+        if image_part:
+            # Add image part to the prompt
+            parts.append(image_part)
+            logger.info("Added image from %s to the prompt", image_url)
+        elif image_url:
+            logger.warning(f"Could not fetch image bytes from {image_url}")
 
         # Create the contents for the Gemini model - using only user role
         contents = [types.Content(role="user", parts=parts)]
@@ -272,14 +684,15 @@ class EnrichmentService:
         try:
             # Log the raw response for debugging
             logger.info(
-                f"Raw response from Gemini: {response_text[:500]}..."
+                "Raw response from Gemini: %.500s...", response_text
             )  # Log first 500 chars
 
             # Try to parse the response as JSON
             response_json = json.loads(response_text)
 
-            # Log the parsed response
-            logger.info(f"Parsed JSON response: {json.dumps(response_json)[:500]}...")
+            # Log the parsed response; re-encoding it is only worth it if shown
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Parsed JSON response: %.500s...", json.dumps(response_json))
 
             # Extract only the requested fields
             enriched_fields = {}
@@ -291,7 +704,9 @@ class EnrichmentService:
 
                         # Log the tech specs format for debugging
                         logger.info(
-                            f"Technical specs format: {type(tech_specs)}, Content: {tech_specs}"
+                            "Technical specs format: %s, Content: %s",
+                            type(tech_specs),
+                            tech_specs,
                         )
 
                         # If it's an empty dict, populate with product-specific values
@@ -352,7 +767,8 @@ class EnrichmentService:
                                     default_specs["Style"] = "Contemporary"
 
                                 logger.info(
-                                    f"Generated specs from product data: {default_specs}"
+                                    "Generated specs from product data: %s",
+                                    default_specs,
                                 )
                             except Exception as e:
                                 logger.warning(
@@ -417,9 +833,10 @@ class EnrichmentService:
                     logger.warning(f"Field {field} not found in response")
 
             # Log the final enriched fields
-            logger.info(
-                f"Final enriched fields: {json.dumps(enriched_fields)[:500]}..."
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Final enriched fields: %.500s...", json.dumps(enriched_fields)
+                )
 
             return enriched_fields
         except json.JSONDecodeError:
@@ -39,6 +39,8 @@ class MarketingService:
             location=location,
         )
         self.model = "gemini-2.0-flash-001"
+        # Reuse connections across image downloads
+        self._session = requests.Session()
 
     def generate_content(
         self,
@@ -145,7 +147,7 @@ class MarketingService:
             else:
                 url = image_url
 
-            response = requests.get(url, timeout=10)
+            response = self._session.get(url, timeout=10)
             if response.status_code == 200:
                 return response.content
             else:
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 import os
+import asyncio
 import uuid
 import logging
 from typing import Dict, List, Any, Optional, Union
@@ -40,6 +41,7 @@ from .services.storage_service import StorageService
 from .services.schema_detection_service import SchemaDetectionService
 from .services.bigquery_service import BigQueryService
 from .services.dataset_service import DatasetService
+from .services.job_state import JobState
 
 # Configure logging
 logging.basicConfig(
@@ -66,7 +68,10 @@ app.add_middleware(
 )
 
 # In-memory storage for jobs (would be replaced with a database in production)
-jobs = {}
+jobs: Dict[str, JobState] = {}
+
+# Per-job locks guarding state transitions made by background tasks
+job_locks: Dict[str, asyncio.Lock] = {}
 
 
 # Define models for API requests and responses
@@ -339,13 +344,13 @@ async def create_and_load_table(
             )
 
         # Create job entry
-        jobs[job_id] = {
-            "job_id": job_id,
-            "status": "RUNNING",
-            "message": "Job started - creating table and loading data with autodetection",
-            "created_at": datetime.now().isoformat(),
-            "completed_at": None,
-            "metadata": {
+        jobs[job_id] = JobState(
+            job_id=job_id,
+            status="RUNNING",
+            message="Job started - creating table and loading data with autodetection",
+            created_at=datetime.now().isoformat(),
+            completed_at=None,
+            metadata={
                 "file_id": file_id,
                 "gcs_uri": gcs_uri,
                 "dataset_id": request.dataset_id,
@@ -353,7 +358,7 @@ async def create_and_load_table(
                 "source_format": request.source_format,
                 "auto_schema_detection": True,
             },
-        }
+        )
 
         # Start create and load job in background
         if background_tasks:
@@ -361,6 +366,7 @@ async def create_and_load_table(
                 bq_service.load_table_from_uri,
                 job_id=job_id,
                 jobs_dict=jobs,
+                jobs_lock=job_locks,
                 dataset_id=request.dataset_id,
                 table_id=request.table_id,
                 uri=gcs_uri,
@@ -391,7 +397,7 @@ async def create_and_load_table(
                 max_bad_records=request.max_bad_records,  # Pass max_bad_records parameter
             )
 
-        return JobStatusResponse(**jobs[job_id])
+        return JobStatusResponse(**jobs[job_id].to_dict())
 
     except Exception as e:
         logger.error(f"Error initiating create and load job: {str(e)}")
@@ -439,20 +445,20 @@ async def load_data(
             )
 
         # Create job entry
-        jobs[job_id] = {
-            "job_id": job_id,
-            "status": "RUNNING",
-            "message": "Job started",
-            "created_at": datetime.now().isoformat(),
-            "completed_at": None,
-            "metadata": {
+        jobs[job_id] = JobState(
+            job_id=job_id,
+            status="RUNNING",
+            message="Job started",
+            created_at=datetime.now().isoformat(),
+            completed_at=None,
+            metadata={
                 "file_id": file_id,
                 "gcs_uri": gcs_uri,
                 "dataset_id": request.dataset_id,
                 "table_id": request.table_id,
                 "source_format": request.source_format,
             },
-        }
+        )
 
         # Start load job in background
         if background_tasks:
@@ -460,6 +466,7 @@ async def load_data(
                 bq_service.load_table_from_uri,
                 job_id=job_id,
                 jobs_dict=jobs,
+                jobs_lock=job_locks,
                 dataset_id=request.dataset_id,
                 table_id=request.table_id,
                 uri=gcs_uri,
@@ -490,7 +497,7 @@ async def load_data(
                 max_bad_records=request.max_bad_records,  # Pass max_bad_records parameter
             )
 
-        return JobStatusResponse(**jobs[job_id])
+        return JobStatusResponse(**jobs[job_id].to_dict())
 
     except Exception as e:
         logger.error(f"Error initiating load job: {str(e)}")
@@ -642,7 +649,7 @@ async def get_job_status(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
 
-    return JobStatusResponse(**jobs[job_id])
+    return JobStatusResponse(**jobs[job_id].to_dict())
 
 
 @app.get("/jobs", response_model=List[JobStatusResponse])
@@ -660,14 +667,14 @@ async def list_jobs(
     filtered_jobs = jobs.values()
 
     if status:
-        filtered_jobs = [job for job in filtered_jobs if job["status"] == status]
+        filtered_jobs = [job for job in filtered_jobs if job.status == status]
 
     # Sort by creation time (newest first) and apply limit
     sorted_jobs = sorted(
-        filtered_jobs, key=lambda job: job["created_at"], reverse=True
+        filtered_jobs, key=lambda job: job.created_at, reverse=True
     )[:limit]
 
-    return [JobStatusResponse(**job) for job in sorted_jobs]
+    return [JobStatusResponse(**job.to_dict()) for job in sorted_jobs]
 
 
 @app.post("/ensure-dataset", response_model=Dict[str, Any])
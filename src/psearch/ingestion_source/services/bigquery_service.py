@@ -14,16 +14,59 @@
 # limitations under the License.
 
 import os
+import asyncio
+import functools
 import logging
-from typing import Dict, List, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Union, Callable
 import json
 from datetime import datetime
 
 from google.cloud import bigquery
 from google.api_core.exceptions import NotFound
+from requests.adapters import HTTPAdapter
+
+from .job_state import JobState, transition_job
 
 logger = logging.getLogger(__name__)
 
+# HTTP connection pool size for the BigQuery client (requests defaults to 10)
+BQ_HTTP_POOL_SIZE = 32
+
+# Number of worker threads for blocking BigQuery client calls. Half the
+# connection pool, so every worker always finds a free socket and the rest
+# stay available to calls made outside the executor.
+BQ_MAX_WORKERS = BQ_HTTP_POOL_SIZE // 2
+
+# Shared across service instances: services are created per request, so a
+# per-instance pool would spawn new threads on every call.
+bq_executor = ThreadPoolExecutor(max_workers=BQ_MAX_WORKERS, thread_name_prefix="bq")
+
+
+@functools.lru_cache(maxsize=None)
+def get_bigquery_client(project_id: str) -> bigquery.Client:
+    """
+    Get the shared BigQuery client for a project, with an enlarged HTTP connection pool.
+    
+    Services are created per request, so the client (and its pooled
+    connections) is cached per project to be reused across requests.
+    Retries are left to the client library's own retry policy.
+    
+    Args:
+        project_id: The Google Cloud project ID
+        
+    Returns:
+        The BigQuery client for the project
+    """
+    client = bigquery.Client(project=project_id)
+    adapter = HTTPAdapter(
+        pool_connections=BQ_HTTP_POOL_SIZE,
+        pool_maxsize=BQ_HTTP_POOL_SIZE,
+    )
+    client._http.mount("https://", adapter)
+    return client
+
+
 class BigQueryService:
     """Service for interacting with BigQuery"""
     
@@ -35,7 +78,24 @@ class BigQueryService:
             project_id: The Google Cloud project ID
         """
         self.project_id = project_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = get_bigquery_client(project_id)
+        self._executor = bq_executor
+    
+    def _run(self, fn: Callable, *args, **kwargs) -> "asyncio.Future":
+        """
+        Run a blocking BigQuery client call on the dedicated executor.
+        
+        Args:
+            fn: The blocking callable to run
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+            
+        Returns:
+            An awaitable resolving to the callable's return value
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
     
     async def create_dataset(
         self, 
@@ -60,7 +120,7 @@ class BigQueryService:
             
             # Check if the dataset already exists
             try:
-                self.client.get_dataset(dataset_ref)
+                await self._run(self.client.get_dataset, dataset_ref)
                 logger.info(f"Dataset {dataset_ref} already exists")
                 return {
                     "created": False,
@@ -76,7 +136,7 @@ class BigQueryService:
                     dataset.description = description
                 
                 # Create the dataset
-                dataset = self.client.create_dataset(dataset)
+                dataset = await self._run(self.client.create_dataset, dataset)
                 logger.info(f"Created dataset {dataset_ref} in {location}")
                 
                 return {
@@ -115,7 +175,7 @@ class BigQueryService:
             
             # Check if the table already exists
             try:
-                self.client.get_table(table_ref)
+                await self._run(self.client.get_table, table_ref)
                 logger.info(f"Table {table_ref} already exists")
                 return {
                     "created": False,
@@ -133,7 +193,7 @@ class BigQueryService:
                     table.description = description
                 
                 # Create the table
-                table = self.client.create_table(table)
+                table = await self._run(self.client.create_table, table)
                 logger.info(f"Created table {table_ref}")
                 
                 return {
@@ -149,7 +209,8 @@ class BigQueryService:
     async def load_table_from_uri(
         self,
         job_id: str,
-        jobs_dict: Dict[str, Dict[str, Any]],
+        jobs_dict: Dict[str, JobState],
+        jobs_lock: Dict[str, asyncio.Lock],
         dataset_id: str,
         table_id: str,
         uri: str,
@@ -169,7 +230,8 @@ class BigQueryService:
         
         Args:
             job_id: The ID of the job in the jobs dictionary
-            jobs_dict: A dictionary to store job status
+            jobs_dict: A dictionary of job ID to JobState
+            jobs_lock: A dictionary of job ID to the lock guarding its state
             dataset_id: The ID of the dataset containing the table
             table_id: The ID of the table to load into
             uri: The Cloud Storage URI to load from
@@ -223,24 +285,25 @@ class BigQueryService:
             table_ref = f"{self.project_id}.{dataset_id}.{table_id}"
             
             # Start the load job
-            load_job = self.client.load_table_from_uri(
+            load_job = await self._run(
+                self.client.load_table_from_uri,
                 uri,
                 table_ref,
                 job_config=job_config
             )
             
             # Update job status to running
-            jobs_dict[job_id].update({
-                "status": "RUNNING",
-                "message": f"Loading data from {uri} to {table_ref}",
-                "metadata": {
-                    **jobs_dict[job_id].get("metadata", {}),
-                    "bq_job_id": load_job.job_id
-                }
-            })
+            await transition_job(
+                jobs_dict,
+                jobs_lock,
+                job_id,
+                status="RUNNING",
+                message=f"Loading data from {uri} to {table_ref}",
+                metadata_updates={"bq_job_id": load_job.job_id},
+            )
             
             # Wait for the job to complete
-            load_job.result()  # This waits for the job to finish
+            await self._run(load_job.result)  # This waits for the job to finish
             
             # Check for errors
             if load_job.errors:
@@ -257,23 +320,25 @@ class BigQueryService:
                     )
                 
                 # Update job status to failed with enhanced error information
-                jobs_dict[job_id].update({
-                    "status": "FAILED",
-                    "message": f"Load job failed: {error_message}{error_details}",
-                    "completed_at": datetime.now().isoformat(),
-                    "metadata": {
-                        **jobs_dict[job_id].get("metadata", {}),
+                await transition_job(
+                    jobs_dict,
+                    jobs_lock,
+                    job_id,
+                    status="FAILED",
+                    message=f"Load job failed: {error_message}{error_details}",
+                    completed_at=datetime.now().isoformat(),
+                    metadata_updates={
                         "error_details": load_job.errors,
                         "bad_records_allowed": max_bad_records
-                    }
-                })
+                    },
+                )
             else:
                 # Get load job statistics
-                destination_table = self.client.get_table(table_ref)
+                destination_table = await self._run(self.client.get_table, table_ref)
                 
                 # Update job status to completed
                 # Get appropriate statistics based on what's available
-                metadata = jobs_dict[job_id].get("metadata", {})
+                metadata = {}
                 metadata["row_count"] = destination_table.num_rows
                 
                 # Handle different attribute names for bytes_processed
@@ -290,12 +355,15 @@ class BigQueryService:
                 except Exception as stats_err:
                     logger.warning(f"Error accessing job statistics: {stats_err}")
                 
-                jobs_dict[job_id].update({
-                    "status": "COMPLETED",
-                    "message": f"Loaded {destination_table.num_rows} rows into {table_ref}",
-                    "completed_at": datetime.now().isoformat(),
-                    "metadata": metadata
-                })
+                await transition_job(
+                    jobs_dict,
+                    jobs_lock,
+                    job_id,
+                    status="COMPLETED",
+                    message=f"Loaded {destination_table.num_rows} rows into {table_ref}",
+                    completed_at=datetime.now().isoformat(),
+                    metadata_updates=metadata,
+                )
                 
                 logger.info(f"Load job completed: {destination_table.num_rows} rows loaded into {table_ref}")
             
@@ -303,11 +371,14 @@ class BigQueryService:
             logger.error(f"Error loading data: {str(e)}")
             
             # Update job status to failed
-            jobs_dict[job_id].update({
-                "status": "FAILED",
-                "message": f"Error loading data: {str(e)}",
-                "completed_at": datetime.now().isoformat()
-            })
+            await transition_job(
+                jobs_dict,
+                jobs_lock,
+                job_id,
+                status="FAILED",
+                message=f"Error loading data: {str(e)}",
+                completed_at=datetime.now().isoformat(),
+            )
     
     def _create_schema_fields(self, schema_fields: List[Dict[str, Any]]) -> List[bigquery.SchemaField]:
         """
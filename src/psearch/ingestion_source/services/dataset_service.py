@@ -13,12 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import functools
 import logging
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable
 from google.cloud import bigquery
 from google.api_core.exceptions import NotFound
 
+from .bigquery_service import bq_executor, get_bigquery_client
+
 logger = logging.getLogger(__name__)
 
 class DatasetService:
@@ -32,7 +36,24 @@ class DatasetService:
             project_id: The Google Cloud project ID
         """
         self.project_id = project_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = get_bigquery_client(project_id)
+        self._executor = bq_executor
+    
+    def _run(self, fn: Callable, *args, **kwargs) -> "asyncio.Future":
+        """
+        Run a blocking BigQuery client call on the shared BigQuery executor.
+        
+        Args:
+            fn: The blocking callable to run
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+            
+        Returns:
+            An awaitable resolving to the callable's return value
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
     
     async def ensure_dataset_exists(self, dataset_id: str, location: str = "US") -> Dict[str, Any]:
         """
@@ -68,7 +89,7 @@ class DatasetService:
             
             # Try to get the dataset
             try:
-                dataset = self.client.get_dataset(dataset_ref)
+                dataset = await self._run(self.client.get_dataset, dataset_ref)
                 logger.info(f"Dataset {dataset_ref} already exists")
                 return {
                     "created": False,
@@ -85,7 +106,7 @@ class DatasetService:
                 dataset.description = f"Dataset created automatically by PSearch"
                 
                 # Create the dataset
-                created_dataset = self.client.create_dataset(dataset)
+                created_dataset = await self._run(self.client.create_dataset, dataset)
                 logger.info(f"Created dataset {dataset_ref} in {location}")
                 
                 return {
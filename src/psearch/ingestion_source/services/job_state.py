@@ -0,0 +1,94 @@
+#
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+
+# Statuses after which a job receives no further transitions
+TERMINAL_JOB_STATUSES = frozenset({"COMPLETED", "FAILED"})
+
+
+@dataclass(frozen=True)
+class JobState:
+    """Immutable snapshot of a background job's status"""
+
+    job_id: str
+    status: str
+    created_at: str
+    message: Optional[str] = None
+    completed_at: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def replace(self, metadata_updates: Optional[Dict[str, Any]] = None, **changes) -> "JobState":
+        """
+        Build the next state of the job.
+
+        Args:
+            metadata_updates: Keys to add to or overwrite in the metadata
+            **changes: Top-level fields to change
+
+        Returns:
+            A new JobState with the changes applied
+        """
+        if metadata_updates:
+            changes["metadata"] = {**self.metadata, **metadata_updates}
+        return dataclasses.replace(self, **changes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the job state as a plain dictionary for API responses"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "message": self.message,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "metadata": self.metadata,
+        }
+
+
+async def transition_job(
+    jobs_dict: Dict[str, JobState],
+    jobs_lock: Dict[str, asyncio.Lock],
+    job_id: str,
+    metadata_updates: Optional[Dict[str, Any]] = None,
+    **changes,
+) -> JobState:
+    """
+    Atomically move a job to its next state under its per-job lock.
+    
+    The lock is dropped once the job reaches a terminal status, so the lock
+    mapping only holds entries for jobs still in progress.
+
+    Args:
+        jobs_dict: Mapping of job ID to current JobState
+        jobs_lock: Mapping of job ID to the lock guarding that job
+        job_id: The ID of the job to update
+        metadata_updates: Keys to add to or overwrite in the metadata
+        **changes: Top-level fields to change
+
+    Returns:
+        The new JobState
+    """
+    if job_id not in jobs_lock:
+        jobs_lock[job_id] = asyncio.Lock()
+    lock = jobs_lock[job_id]
+    async with lock:
+        new_state = jobs_dict[job_id].replace(metadata_updates, **changes)
+        jobs_dict[job_id] = new_state
+        if new_state.status in TERMINAL_JOB_STATUSES:
+            jobs_lock.pop(job_id, None)
+        return new_state
@@ -14,19 +14,250 @@
 # limitations under the License.
 
 import os
+import sys
+import asyncio
 import csv
+import functools
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
+import itertools
+from collections import deque
+from typing import Dict, List, Any, Optional, Union, BinaryIO, Tuple, Set
 import tempfile
 import io
 import re
 
+import ijson
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 from fastapi import UploadFile
 
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    # RE2 matches these prefix patterns as a DFA, without backtracking
+    import re2 as _pattern_engine
+except ImportError:
+    _pattern_engine = re
+
 logger = logging.getLogger(__name__)
 
+# Common timestamp patterns, combined into one anchored alternation:
+# ISO format or similar, YYYY/MM/DD HH:MM:SS, MM/DD/YYYY HH:MM:SS
+_TIMESTAMP_RE = _pattern_engine.compile(
+    r'^(?:\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}'
+    r'|\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}'
+    r'|\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2})'
+)
+
+# Common date patterns: YYYY-MM-DD, YYYY/MM/DD, MM/DD/YYYY, MM-DD-YYYY
+_DATE_RE = _pattern_engine.compile(
+    r'^(?:\d{4}-\d{2}-\d{2}'
+    r'|\d{4}/\d{2}/\d{2}'
+    r'|\d{2}/\d{2}/\d{4}'
+    r'|\d{2}-\d{2}-\d{4})$'
+)
+
+# Arrow type predicates and their BigQuery types, for Arrow-backed columns
+_ARROW_TYPE_TO_BQ = (
+    (pa.types.is_boolean, "BOOLEAN"),
+    (pa.types.is_integer, "INTEGER"),
+    (pa.types.is_floating, "FLOAT"),
+    (pa.types.is_decimal, "NUMERIC"),
+    (pa.types.is_timestamp, "TIMESTAMP"),
+    (pa.types.is_date, "DATE"),
+    (pa.types.is_time, "TIME"),
+)
+
+# BigQuery (type, mode) for JSON values whose type alone decides the result.
+# Keyed on the exact type, so bool never falls through to int.
+_JSON_TYPE_MAP = {
+    type(None): ("STRING", "NULLABLE"),
+    bool: ("BOOLEAN", "NULLABLE"),
+    int: ("INTEGER", "NULLABLE"),
+    float: ("FLOAT", "NULLABLE"),
+    dict: ("RECORD", "NULLABLE"),
+}
+
+# BigQuery (type, mode) for JSON arrays, keyed on the first element's type
+_JSON_ARRAY_TYPE_MAP = {
+    dict: ("RECORD", "REPEATED"),
+    bool: ("BOOLEAN", "REPEATED"),
+    int: ("INTEGER", "REPEATED"),
+    float: ("FLOAT", "REPEATED"),
+    str: ("STRING", "REPEATED"),
+}
+
+# Lower-cased strings accepted as boolean values
+_BOOL_STRINGS = frozenset({"true", "false", "t", "f", "yes", "no", "y", "n", "1", "0"})
+
+# ijson events at an array item's own prefix that do not start a new item
+_ITEM_CLOSING_EVENTS = frozenset({"end_map", "end_array", "map_key"})
+
+# Mapping from numpy dtype kind codes to BigQuery types
+_KIND_TO_BQ = {
+    'i': "INTEGER",
+    'u': "INTEGER",
+    'f': "FLOAT",
+    'b': "BOOLEAN",
+    'M': "TIMESTAMP",
+}
+
+
+def _looks_like_timestamp(value: str) -> bool:
+    """
+    Check if a string value looks like a timestamp.
+
+    Args:
+        value: A string value
+
+    Returns:
+        True if the value looks like a timestamp, False otherwise
+    """
+    return bool(_TIMESTAMP_RE.match(value))
+
+
+def _looks_like_date(value: str) -> bool:
+    """
+    Check if a string value looks like a date.
+
+    Args:
+        value: A string value
+
+    Returns:
+        True if the value looks like a date, False otherwise
+    """
+    return bool(_DATE_RE.match(value))
+
+
+@functools.lru_cache(maxsize=8192)
+def _clean_column_name(name: str) -> str:
+    """
+    Clean a column name to be BigQuery-friendly.
+
+    Args:
+        name: The original column name
+
+    Returns:
+        A BigQuery-friendly column name
+    """
+    # Replace any character that's not alphanumeric or underscore with underscore
+    cleaned = re.sub(r'[^\w]', '_', name)
+
+    # Ensure the name starts with a letter or underscore
+    if cleaned and not (cleaned[0].isalpha() or cleaned[0] == '_'):
+        cleaned = f"col_{cleaned}"
+
+    # Handle empty names
+    if not cleaned:
+        cleaned = "unnamed_column"
+
+    return cleaned
+
+
+# Delimiters recognised when sniffing the first line, in tie-break order
+_CANDIDATE_DELIMITERS = ",;\t|"
+
+
+class _FirstLineSniffer(csv.Sniffer):
+    """csv.Sniffer that reuses an already detected dialect for has_header"""
+    
+    def __init__(self, dialect: Any):
+        super().__init__()
+        self._dialect = dialect
+    
+    def sniff(self, sample: str, delimiters: Optional[str] = None) -> Any:
+        return self._dialect
+
+
+def _sniff_csv(sample_text: str) -> Tuple[Any, bool]:
+    """
+    Detect the CSV dialect and header presence of a sample.
+    
+    The delimiter is the most frequent candidate on the first line, which is
+    a single linear scan instead of csv.Sniffer's statistical dialect search.
+    
+    Args:
+        sample_text: The decoded start of the CSV file
+        
+    Returns:
+        A tuple of (dialect, has_header)
+    """
+    first_line = sample_text.split("\n", 1)[0]
+    delimiter = max(_CANDIDATE_DELIMITERS, key=first_line.count)
+    if not first_line.count(delimiter):
+        delimiter = ","
+    
+    dialect = type("DetectedDialect", (csv.excel,), {"delimiter": delimiter})
+    return dialect, _FirstLineSniffer(dialect).has_header(sample_text)
+
+
+class _SchemaBuilder:
+    """
+    Column-oriented accumulator for a merged JSON schema.
+    
+    Field attributes live in parallel lists indexed through a name lookup, so
+    merging a record updates list slots instead of per-field dictionaries.
+    """
+    
+    __slots__ = ("index", "names", "types", "modes", "nested", "converged")
+    
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        # Fields in the absorbing STRING/REPEATED state, which no later
+        # value can change
+        self.converged: Set[str] = set()
+        self.names: List[str] = []
+        self.types: List[str] = []
+        self.modes: List[str] = []
+        self.nested: List[Optional["_SchemaBuilder"]] = []
+    
+    def add(self, name: str, field_type: str, mode: str, nested: Optional["_SchemaBuilder"] = None):
+        """
+        Add a field, replacing any field that already has the same name.
+        
+        Args:
+            name: The cleaned column name
+            field_type: The BigQuery type
+            mode: The BigQuery mode
+            nested: The nested fields of a RECORD field
+        """
+        index = self.index.get(name)
+        if index is not None:
+            self.types[index] = field_type
+            self.modes[index] = mode
+            self.nested[index] = nested
+            return
+        
+        self.index[sys.intern(name)] = len(self.names)
+        self.names.append(name)
+        self.types.append(field_type)
+        self.modes.append(mode)
+        self.nested.append(nested)
+    
+    def to_fields(self) -> List[Dict[str, Any]]:
+        """
+        Convert the accumulated fields to the list-of-dicts schema format.
+        
+        Returns:
+            A list of schema fields
+        """
+        fields = []
+        
+        for name, field_type, mode, nested in zip(self.names, self.types, self.modes, self.nested):
+            field = {"name": name, "type": field_type, "mode": mode}
+            if nested is not None:
+                field["fields"] = nested.to_fields()
+            fields.append(field)
+        
+        return fields
+
+
 class SchemaDetectionService:
     """Service for detecting schema from uploaded CSV and JSON files"""
     
@@ -86,57 +317,38 @@ class SchemaDetectionService:
         Returns:
             A dictionary containing the detected schema
         """
-        # Read the CSV file into a pandas DataFrame
+        # Read a sample of the CSV file with Arrow's CSV reader
         # We limit to a sample to avoid loading very large files
         try:
             # First read a small sample to determine the dialect
             sample_data = await file.read(4096)
             await file.seek(0)  # Reset the file pointer
             
+            # Trim the sample to whole lines so a multi-byte character cut
+            # at the 4 KiB boundary cannot break the single decode
+            last_newline = sample_data.rfind(b"\n")
+            if last_newline > 0:
+                sample_data = sample_data[:last_newline + 1]
+            sample_text = sample_data.decode('utf-8')
+            
             # Use csv.Sniffer to determine the dialect
-            dialect = csv.Sniffer().sniff(sample_data.decode('utf-8'))
-            has_header = csv.Sniffer().has_header(sample_data.decode('utf-8'))
+            dialect, has_header = _sniff_csv(sample_text)
             
-            # Read the CSV into a DataFrame
-            content = await file.read()
-            csv_file = io.StringIO(content.decode('utf-8'))
-            
-            df = pd.read_csv(
-                csv_file, 
-                dialect=dialect,
-                header=0 if has_header else None,
-                nrows=self.MAX_ROWS_TO_SAMPLE
-            )
+            # Read the sampled rows straight from the spooled upload in a
+            # worker thread, without buffering the whole file in memory
+            await file.seek(0)
+            df = await asyncio.to_thread(self._read_csv_sample, file.file, dialect, has_header)
             
             # If no header, generate column names
             if not has_header:
                 df.columns = [f"column_{i}" for i in range(len(df.columns))]
             
             # Clean column names to be BigQuery-friendly
-            df.columns = [self._clean_column_name(col) for col in df.columns]
-            
-            # Infer types for each column
-            schema_fields = []
+            df.columns = self._clean_column_names(df.columns)
             
-            for column in df.columns:
-                # Get the pandas type
-                pandas_type = str(df[column].dtype)
-                
-                # Handle special cases
-                if pandas_type == 'object':
-                    # For object type, check if it's actually a date, time, or boolean
-                    # by sampling the first few non-null values
-                    sample_values = df[column].dropna().head(10).tolist()
-                    inferred_type = self._infer_string_type(sample_values)
-                else:
-                    inferred_type = self._map_pandas_type_to_bq(pandas_type)
-                
-                # Create the schema field
-                schema_fields.append({
-                    "name": column,
-                    "type": inferred_type,
-                    "mode": "NULLABLE"
-                })
+            # Infer types for each column in a worker thread, so the event
+            # loop is not blocked while every sampled value is checked
+            schema_fields = await asyncio.to_thread(self._infer_csv_schema_fields, df)
             
             return {
                 "schema_fields": schema_fields,
@@ -155,6 +367,167 @@ class SchemaDetectionService:
             logger.error(f"Error detecting CSV schema: {str(e)}")
             raise
     
+    def _infer_csv_schema_fields(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Infer BigQuery schema fields for the columns of a CSV sample.
+        
+        Args:
+            df: The sampled rows, with cleaned column names
+            
+        Returns:
+            A list of schema field dictionaries
+        """
+        # Infer types for each column
+        schema_fields = []
+        
+        # Select columns by position, since header names may repeat
+        columns = [df.iloc[:, index] for index in range(len(df.columns))]
+        
+        for column, series in zip(df.columns, columns):
+            # Get the pandas type
+            dtype = series.dtype
+            
+            # Handle special cases
+            if self._needs_string_inference(dtype):
+                # For object type, check if it's actually a date, time, or boolean
+                # across all sampled values of the column
+                inferred_type = self._infer_string_type(series)
+            else:
+                inferred_type = self._map_pandas_type_to_bq(dtype)
+            
+            # Create the schema field
+            schema_fields.append({
+                "name": column,
+                "type": inferred_type,
+                "mode": "NULLABLE"
+            })
+        
+        return schema_fields
+    
+    def _clean_column_names(self, columns: pd.Index) -> List[str]:
+        """
+        Clean a whole header to be BigQuery-friendly in one vectorized pass.
+        
+        Applies the same rules as _clean_column_name to every column.
+        
+        Args:
+            columns: The original column names
+            
+        Returns:
+            A list of BigQuery-friendly column names
+        """
+        # Replace any character that's not alphanumeric or underscore with underscore
+        # (object dtype keeps Python's Unicode-aware \w semantics)
+        cleaned = pd.Index(columns.astype(str), dtype=object).str.replace(r'[^\w]', '_', regex=True)
+        
+        # Ensure the name starts with a letter or underscore
+        first = cleaned.str[:1]
+        needs_prefix = (first != "") & ~first.str.isalpha() & (first != "_")
+        cleaned = cleaned.where(~needs_prefix, "col_" + cleaned)
+        
+        # Handle empty names
+        cleaned = cleaned.where(cleaned != "", "unnamed_column")
+        
+        # Suffix repeated names (a, a_1, a_2, ...) so BigQuery field names stay unique
+        seen = set()
+        unique = []
+        for name in cleaned.tolist():
+            candidate, suffix = name, 0
+            while candidate in seen:
+                suffix += 1
+                candidate = f"{name}_{suffix}"
+            seen.add(candidate)
+            unique.append(candidate)
+        
+        return unique
+    
+    def _read_csv_sample(
+        self,
+        source: BinaryIO,
+        dialect: Any,
+        has_header: bool,
+    ) -> pd.DataFrame:
+        """
+        Read up to MAX_ROWS_TO_SAMPLE rows of a CSV file using pyarrow.
+        
+        Arrow's streaming reader fixes column types from the first block, so
+        if a later value does not convert, the sample is re-read with pandas,
+        which widens such columns to strings instead.
+        
+        Args:
+            source: A binary file object containing the CSV data
+            dialect: The dialect detected by csv.Sniffer
+            has_header: Whether the first row is a header
+            
+        Returns:
+            A DataFrame with the sampled rows and Arrow-inferred column types
+        """
+        try:
+            return self._read_csv_sample_arrow(source, dialect, has_header)
+        except pa.ArrowInvalid as e:
+            logger.info(f"Falling back to pandas for the CSV sample: {str(e)}")
+            source.seek(0)
+            return pd.read_csv(
+                source,
+                dialect=dialect,
+                header=0 if has_header else None,
+                nrows=self.MAX_ROWS_TO_SAMPLE,
+            )
+    
+    def _read_csv_sample_arrow(
+        self,
+        source: BinaryIO,
+        dialect: Any,
+        has_header: bool,
+    ) -> pd.DataFrame:
+        """
+        Stream up to MAX_ROWS_TO_SAMPLE rows of a CSV file through pyarrow.
+        
+        Args:
+            source: A binary file object containing the CSV data
+            dialect: The dialect detected by csv.Sniffer
+            has_header: Whether the first row is a header
+            
+        Returns:
+            A DataFrame with the sampled rows and Arrow-inferred column types
+            
+        Raises:
+            pyarrow.ArrowInvalid: If a value does not convert to its column's type
+        """
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(
+                block_size=1 << 20,
+                autogenerate_column_names=not has_header,
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=dialect.delimiter,
+                quote_char=dialect.quotechar or False,
+                double_quote=dialect.doublequote,
+                escape_char=dialect.escapechar or False,
+            ),
+        )
+        
+        # Stop reading once enough rows have been decoded
+        batches = []
+        row_count = 0
+        for batch in reader:
+            batches.append(batch)
+            row_count += batch.num_rows
+            if row_count >= self.MAX_ROWS_TO_SAMPLE:
+                break
+        
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        
+        # Convert under positional names, since to_pandas merges repeated
+        # header names into one column type
+        names = table.column_names
+        table = table.slice(0, self.MAX_ROWS_TO_SAMPLE).rename_columns([str(i) for i in range(len(names))])
+        # Keep Arrow's inferred types rather than converting to numpy dtypes
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+        df.columns = names
+        return df
+    
     async def _detect_json_schema(self, file: UploadFile) -> Dict[str, Any]:
         """
         Detect schema from a JSON file.
@@ -166,50 +539,162 @@ class SchemaDetectionService:
             A dictionary containing the detected schema
         """
         try:
-            # Read the content of the file
-            content = await file.read()
-            
-            # Parse JSON content
-            json_data = json.loads(content)
+            # Parse from the spooled upload in a worker thread so the event
+            # loop is not blocked while the sample is streamed
+            await file.seek(0)
+            json_data, row_count, is_ndjson = await asyncio.to_thread(
+                self._sample_json_stream, file.file
+            )
             
-            # Determine if the root is a single object or an array of objects
+            # Determine if the root is a single object or a list of records
+            # (a JSON array or newline-delimited objects)
             if isinstance(json_data, list):
-                # For an array, sample a subset of records
-                sample_size = min(len(json_data), self.MAX_ROWS_TO_SAMPLE)
-                sample = json_data[:sample_size]
-                row_count = len(json_data)
+                sample = json_data
                 
                 # Detect schema from the first object as a starting point
                 if sample:
-                    schema_fields = self._detect_json_object_schema(sample[0])
+                    builder = self._detect_json_object_schema(sample[0])
                     
-                    # Iterate through the rest to refine/expand the schema
-                    field_map = {field["name"]: field for field in schema_fields}
+                    # Iterate through the rest to refine/expand the schema.
+                    # Merging a shape that was already merged is a no-op, so
+                    # only records with a new shape need to be processed
+                    seen_shapes = {self._shape_signature(sample[0])}
                     
                     for record in sample[1:]:
-                        self._update_schema_from_object(field_map, record)
+                        shape = self._shape_signature(record)
+                        if shape in seen_shapes:
+                            continue
+                        seen_shapes.add(shape)
+                        self._update_schema_from_object(builder, record)
                     
                     # Convert back to list
-                    schema_fields = list(field_map.values())
+                    schema_fields = builder.to_fields()
                 else:
                     # Empty array
                     schema_fields = []
             else:
                 # Single object
-                schema_fields = self._detect_json_object_schema(json_data)
-                row_count = 1
+                schema_fields = self._detect_json_object_schema(json_data).to_fields()
             
             return {
                 "schema_fields": schema_fields,
                 "row_count_estimate": row_count,
-                "is_array": isinstance(json_data, list)
+                "is_array": isinstance(json_data, list) and not is_ndjson,
+                "is_ndjson": is_ndjson
             }
             
         except Exception as e:
             logger.error(f"Error detecting JSON schema: {str(e)}")
             raise
     
-    def _detect_json_object_schema(self, obj: Dict[str, Any]) -> List[Dict[str, str]]:
+    def _sample_json_stream(self, stream: BinaryIO) -> Tuple[Any, int, bool]:
+        """
+        Parse a JSON document, streaming only the sampled records of an
+        array or newline-delimited file.
+        
+        Args:
+            stream: A binary file object positioned at the start of the document
+            
+        Returns:
+            A tuple of (sampled records or single object, row count estimate,
+            whether the file is newline-delimited JSON)
+        """
+        first_byte = self._peek_first_byte(stream)
+        
+        if first_byte == b"{":
+            ndjson_sample = self._sample_ndjson_stream(stream)
+            if ndjson_sample is not None:
+                sample, row_count = ndjson_sample
+                return sample, row_count, True
+        
+        if first_byte != b"[":
+            # Single object - parse it whole
+            return _json_loads(stream.read()), 1, False
+        
+        # Stream array items, stopping once the sample is full
+        events = ijson.parse(stream, use_float=True)
+        items = ijson.items(events, "item")
+        sample = list(itertools.islice(items, self.MAX_ROWS_TO_SAMPLE))
+        
+        # Count the remaining items from the same parse events, without
+        # building them: each item opens with one event at the "item" prefix
+        remaining = sum(
+            1
+            for prefix, event, _ in events
+            if prefix == "item" and event not in _ITEM_CLOSING_EVENTS
+        )
+        return sample, len(sample) + remaining, False
+    
+    def _sample_ndjson_stream(self, stream: BinaryIO) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Sample a newline-delimited JSON file one line at a time.
+        
+        Args:
+            stream: A binary file object positioned at the start of the document
+            
+        Returns:
+            A tuple of (sampled records, row count estimate), or None if the
+            document is a single object rather than one object per line
+        """
+        sample = []
+        row_count = 0
+        
+        for line in stream:
+            if not line.strip():
+                continue
+            
+            row_count += 1
+            if row_count > self.MAX_ROWS_TO_SAMPLE:
+                break
+            
+            try:
+                sample.append(_json_loads(line))
+            except ValueError:
+                if row_count == 1:
+                    # First line is not a complete object, e.g. a
+                    # pretty-printed single object
+                    stream.seek(0)
+                    return None
+                raise
+        
+        if row_count <= 1:
+            # A single one-line object is not treated as NDJSON
+            stream.seek(0)
+            return None
+        
+        # Count the remaining rows without parsing them
+        last_chunk = b"\n"
+        for chunk in iter(lambda: stream.read(1 << 20), b""):
+            row_count += chunk.count(b"\n")
+            last_chunk = chunk
+        if not last_chunk.endswith(b"\n"):
+            row_count += 1
+        
+        return sample, row_count
+    
+    def _peek_first_byte(self, stream: BinaryIO) -> bytes:
+        """
+        Return the first non-whitespace byte of a stream and rewind it.
+        
+        Args:
+            stream: A binary file object positioned at the start of the document
+            
+        Returns:
+            The first non-whitespace byte, or b"" for an empty stream
+        """
+        first_byte = b""
+        while True:
+            chunk = stream.read(1024)
+            if not chunk:
+                break
+            stripped = chunk.lstrip()
+            if stripped:
+                first_byte = stripped[:1]
+                break
+        stream.seek(0)
+        return first_byte
+    
+    def _detect_json_object_schema(self, obj: Dict[str, Any]) -> "_SchemaBuilder":
         """
         Detect schema from a JSON object.
         
@@ -217,102 +702,111 @@ class SchemaDetectionService:
             obj: A JSON object
             
         Returns:
-            A list of schema fields
+            A schema builder holding the object's fields
         """
-        schema_fields = []
+        root = _SchemaBuilder()
         
-        for key, value in obj.items():
-            # Clean the key to make it a valid BigQuery column name
-            clean_key = self._clean_column_name(key)
+        # Walk nested objects with an explicit stack of (builder, object)
+        # pairs instead of one Python frame per nesting level
+        stack = [(root, obj)]
+        
+        while stack:
+            builder, current = stack.pop()
+            
+            for key, value in current.items():
+                # Clean the key to make it a valid BigQuery column name
+                clean_key = _clean_column_name(key)
+                
+                # Determine the type and mode
+                field_type, field_mode = self._get_json_field_type_and_mode(value)
+                
+                # For RECORD types, queue the object to fill the nested fields;
+                # for arrays of objects, detect schema from the first object
+                nested = None
+                if field_type == "RECORD":
+                    nested = _SchemaBuilder()
+                    stack.append((nested, value[0] if isinstance(value, list) else value))
+                
+                builder.add(clean_key, field_type, field_mode, nested)
+        
+        return root
+    
+    def _shape_signature(self, obj: Dict[str, Any]) -> frozenset:
+        """
+        Summarize the parts of an object that affect the merged schema.
+        
+        Args:
+            obj: A JSON object
             
-            # Determine the type and mode
+        Returns:
+            A hashable signature of field names, types, modes and nested shapes
+        """
+        signature = []
+        
+        for key, value in obj.items():
             field_type, field_mode = self._get_json_field_type_and_mode(value)
             
-            # For RECORD types, recurse to get the nested fields
-            if field_type == "RECORD" and not isinstance(value, list):
-                nested_fields = self._detect_json_object_schema(value)
-                schema_fields.append({
-                    "name": clean_key,
-                    "type": field_type,
-                    "mode": field_mode,
-                    "fields": nested_fields
-                })
-            elif field_type == "RECORD" and isinstance(value, list) and value and isinstance(value[0], dict):
-                # For arrays of objects, detect schema from the first object
-                nested_fields = self._detect_json_object_schema(value[0])
-                schema_fields.append({
-                    "name": clean_key,
-                    "type": field_type,
-                    "mode": field_mode,
-                    "fields": nested_fields
-                })
-            else:
-                schema_fields.append({
-                    "name": clean_key,
-                    "type": field_type,
-                    "mode": field_mode
-                })
+            nested = None
+            if isinstance(value, dict):
+                nested = self._shape_signature(value)
+            elif isinstance(value, list) and value and isinstance(value[0], dict):
+                nested = self._shape_signature(value[0])
+            
+            signature.append((key, field_type, field_mode, nested))
         
-        return schema_fields
+        return frozenset(signature)
     
-    def _update_schema_from_object(self, field_map: Dict[str, Dict[str, Any]], obj: Dict[str, Any]):
+    def _update_schema_from_object(self, builder: "_SchemaBuilder", obj: Dict[str, Any]):
         """
         Update an existing schema based on a new object.
         
         Args:
-            field_map: A map of field names to their schema
+            builder: The schema builder to update in place
             obj: A JSON object to incorporate into the schema
         """
-        for key, value in obj.items():
-            clean_key = self._clean_column_name(key)
+        # Nested merges are queued first-in first-out, so each builder sees
+        # its objects in the same order as a recursive walk would
+        pending = deque([(builder, obj)])
+        
+        while pending:
+            builder, current = pending.popleft()
             
-            if clean_key not in field_map:
-                # New field
-                field_type, field_mode = self._get_json_field_type_and_mode(value)
+            for key, value in current.items():
+                clean_key = _clean_column_name(key)
+                if clean_key in builder.converged:
+                    continue
                 
-                if field_type == "RECORD" and not isinstance(value, list):
-                    nested_fields = self._detect_json_object_schema(value)
-                    field_map[clean_key] = {
-                        "name": clean_key,
-                        "type": field_type,
-                        "mode": field_mode,
-                        "fields": nested_fields
-                    }
-                elif field_type == "RECORD" and isinstance(value, list) and value and isinstance(value[0], dict):
-                    nested_fields = self._detect_json_object_schema(value[0])
-                    field_map[clean_key] = {
-                        "name": clean_key,
-                        "type": field_type,
-                        "mode": field_mode,
-                        "fields": nested_fields
-                    }
-                else:
-                    field_map[clean_key] = {
-                        "name": clean_key,
-                        "type": field_type,
-                        "mode": field_mode
-                    }
-            else:
-                # Existing field - check for type conflicts or nested field updates
-                existing = field_map[clean_key]
                 new_type, new_mode = self._get_json_field_type_and_mode(value)
                 
+                index = builder.index.get(clean_key)
+                if index is None:
+                    # New field
+                    nested = None
+                    if new_type == "RECORD":
+                        nested = self._detect_json_object_schema(value[0] if isinstance(value, list) else value)
+                    builder.add(clean_key, new_type, new_mode, nested)
+                    continue
+                
+                # Existing field - check for type conflicts or nested field updates
+                
                 # Update mode if necessary (NULLABLE -> REPEATED)
-                if existing["mode"] == "NULLABLE" and new_mode == "REPEATED":
-                    existing["mode"] = "REPEATED"
+                if builder.modes[index] == "NULLABLE" and new_mode == "REPEATED":
+                    builder.modes[index] = "REPEATED"
                 
                 # Handle type conflicts by defaulting to string
-                if existing["type"] != new_type:
-                    if existing["type"] != "STRING":
-                        existing["type"] = "STRING"
+                existing_type = builder.types[index]
+                if existing_type != new_type and existing_type != "STRING":
+                    existing_type = builder.types[index] = "STRING"
+                
+                if existing_type == "STRING" and builder.modes[index] == "REPEATED":
+                    builder.converged.add(clean_key)
+                    continue
                 
                 # Update nested fields if both are records
-                if existing["type"] == "RECORD" and new_type == "RECORD":
-                    if "fields" in existing and not isinstance(value, list):
-                        # Create a nested field map
-                        nested_field_map = {field["name"]: field for field in existing["fields"]}
-                        self._update_schema_from_object(nested_field_map, value)
-                        existing["fields"] = list(nested_field_map.values())
+                if existing_type == "RECORD" and new_type == "RECORD":
+                    nested = builder.nested[index]
+                    if nested is not None and not isinstance(value, list):
+                        pending.append((nested, value))
     
     def _get_json_field_type_and_mode(self, value: Any) -> tuple:
         """
@@ -324,33 +818,22 @@ class SchemaDetectionService:
         Returns:
             A tuple of (type, mode)
         """
-        if value is None:
-            return "STRING", "NULLABLE"
-        
-        if isinstance(value, bool):
-            return "BOOLEAN", "NULLABLE"
-        
-        if isinstance(value, int):
-            return "INTEGER", "NULLABLE"
-        
-        if isinstance(value, float):
-            return "FLOAT", "NULLABLE"
+        field_type_and_mode = _JSON_TYPE_MAP.get(type(value))
+        if field_type_and_mode is not None:
+            return field_type_and_mode
         
         if isinstance(value, str):
             # Check if the string might be a timestamp
-            if self._looks_like_timestamp(value):
+            if _looks_like_timestamp(value):
                 return "TIMESTAMP", "NULLABLE"
             
             # Check if the string might be a date
-            if self._looks_like_date(value):
+            if _looks_like_date(value):
                 return "DATE", "NULLABLE"
             
             # Default to string
             return "STRING", "NULLABLE"
         
-        if isinstance(value, dict):
-            return "RECORD", "NULLABLE"
-        
         if isinstance(value, list):
             if not value:
                 # Empty list, default to STRING REPEATED
@@ -358,158 +841,85 @@ class SchemaDetectionService:
             
             # For lists, determine the type of the first element
             # and set mode to REPEATED
-            sample = value[0]
-            
-            if isinstance(sample, dict):
-                return "RECORD", "REPEATED"
-            
-            if isinstance(sample, bool):
-                return "BOOLEAN", "REPEATED"
-            
-            if isinstance(sample, int):
-                return "INTEGER", "REPEATED"
-            
-            if isinstance(sample, float):
-                return "FLOAT", "REPEATED"
-            
-            if isinstance(sample, str):
-                return "STRING", "REPEATED"
-            
-            # Default
-            return "STRING", "REPEATED"
+            return _JSON_ARRAY_TYPE_MAP.get(type(value[0]), ("STRING", "REPEATED"))
         
         # Default case
         return "STRING", "NULLABLE"
     
-    def _map_pandas_type_to_bq(self, pandas_type: str) -> str:
+    def _needs_string_inference(self, dtype: Any) -> bool:
         """
-        Map pandas data type to BigQuery data type.
+        Check whether a column holds strings that may encode a richer type.
         
         Args:
-            pandas_type: The pandas data type string
+            dtype: The pandas dtype of the column
             
         Returns:
-            The corresponding BigQuery data type
+            True if the column should go through _infer_string_type
         """
-        # Handle common pandas types
-        if pandas_type.startswith("int"):
-            return "INTEGER"
-        
-        if pandas_type.startswith("float"):
-            return "FLOAT"
+        if isinstance(dtype, pd.ArrowDtype):
+            arrow_type = dtype.pyarrow_dtype
+            return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
         
-        if pandas_type.startswith("bool"):
-            return "BOOLEAN"
+        return dtype.kind == 'O'
+    
+    def _map_pandas_type_to_bq(self, dtype: Any) -> str:
+        """
+        Map pandas data type to BigQuery data type.
         
-        if pandas_type.startswith("datetime"):
-            return "TIMESTAMP"
+        Args:
+            dtype: The pandas dtype of the column, numpy or Arrow backed
+            
+        Returns:
+            The corresponding BigQuery data type
+        """
+        if isinstance(dtype, pd.ArrowDtype):
+            arrow_type = dtype.pyarrow_dtype
+            for matches, bq_type in _ARROW_TYPE_TO_BQ:
+                if matches(arrow_type):
+                    return bq_type
+            return "STRING"
         
         # Default to string for object and other types
-        return "STRING"
+        return _KIND_TO_BQ.get(dtype.kind, "STRING")
     
-    def _infer_string_type(self, sample_values: List[Any]) -> str:
+    def _infer_string_type(self, series: pd.Series) -> str:
         """
         Try to infer a more specific type from string values.
         
         Args:
-            sample_values: A list of sample values
+            series: The sampled column values
             
         Returns:
             The inferred BigQuery type
         """
-        if not sample_values:
+        # Only consider non-null, non-empty values. Columns that already hold
+        # strings are matched in place rather than copied through astype.
+        values = series.dropna()
+        if not pd.api.types.is_string_dtype(values):
+            values = values.astype(str)
+        values = values[values != ""]
+        
+        if values.empty:
             return "STRING"
         
-        # Check if all non-null values match timestamp format
-        non_null_values = [v for v in sample_values if v is not None and v != ""]
-        
-        if all(self._looks_like_timestamp(str(v)) for v in non_null_values):
+        # Check if all values match timestamp format
+        if values.str.match(_TIMESTAMP_RE.pattern).all():
             return "TIMESTAMP"
         
-        # Check if all non-null values match date format
-        if all(self._looks_like_date(str(v)) for v in non_null_values):
+        # Check if all values match date format
+        if values.str.match(_DATE_RE.pattern).all():
             return "DATE"
         
         # Check if all values are boolean-like
-        bool_values = {"true", "false", "t", "f", "yes", "no", "y", "n", "1", "0"}
-        if all(str(v).lower() in bool_values for v in non_null_values):
+        if values.str.lower().isin(_BOOL_STRINGS).all():
             return "BOOLEAN"
         
-        # Check if all values are integers
-        try:
-            if all(float(v).is_integer() for v in non_null_values):
+        # Check if all values are numeric, and whether they are whole numbers
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        if not np.isnan(numbers).any():
+            if (numbers % 1 == 0).all():
                 return "INTEGER"
-        except (ValueError, TypeError):
-            pass
-        
-        # Check if all values are floats
-        try:
-            if all(isinstance(float(v), float) for v in non_null_values):
-                return "FLOAT"
-        except (ValueError, TypeError):
-            pass
+            return "FLOAT"
         
         # Default to string
         return "STRING"
-    
-    def _looks_like_timestamp(self, value: str) -> bool:
-        """
-        Check if a string value looks like a timestamp.
-        
-        Args:
-            value: A string value
-            
-        Returns:
-            True if the value looks like a timestamp, False otherwise
-        """
-        # Common timestamp patterns
-        timestamp_patterns = [
-            r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}',  # ISO format or similar
-            r'^\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2}',     # YYYY/MM/DD HH:MM:SS
-            r'^\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}',     # MM/DD/YYYY HH:MM:SS
-        ]
-        
-        return any(re.match(pattern, value) for pattern in timestamp_patterns)
-    
-    def _looks_like_date(self, value: str) -> bool:
-        """
-        Check if a string value looks like a date.
-        
-        Args:
-            value: A string value
-            
-        Returns:
-            True if the value looks like a date, False otherwise
-        """
-        # Common date patterns
-        date_patterns = [
-            r'^\d{4}-\d{2}-\d{2}$',  # YYYY-MM-DD
-            r'^\d{4}/\d{2}/\d{2}$',  # YYYY/MM/DD
-            r'^\d{2}/\d{2}/\d{4}$',  # MM/DD/YYYY
-            r'^\d{2}-\d{2}-\d{4}$',  # MM-DD-YYYY
-        ]
-        
-        return any(re.match(pattern, value) for pattern in date_patterns)
-    
-    def _clean_column_name(self, name: str) -> str:
-        """
-        Clean a column name to be BigQuery-friendly.
-        
-        Args:
-            name: The original column name
-            
-        Returns:
-            A BigQuery-friendly column name
-        """
-        # Replace any character that's not alphanumeric or underscore with underscore
-        cleaned = re.sub(r'[^\w]', '_', name)
-        
-        # Ensure the name starts with a letter or underscore
-        if cleaned and not (cleaned[0].isalpha() or cleaned[0] == '_'):
-            cleaned = f"col_{cleaned}"
-        
-        # Handle empty names
-        if not cleaned:
-            cleaned = "unnamed_column"
-        
-        return cleaned
@@ -14,25 +14,170 @@
 # limitations under the License.
 
 import os
+import asyncio
 import logging
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, BinaryIO
+import io
+import itertools
 import tempfile
+import shutil
+import threading
+from types import MappingProxyType
 import json # Add this import
+import re
 
+import ijson
 from fastapi import UploadFile
 from google.cloud import storage
 
+try:
+    # orjson parses straight from bytes and serializes to bytes
+    import orjson
+
+    # A run of 20+ digits may be an integer beyond 64 bits, which orjson
+    # silently turns into a float
+    _LONG_DIGITS_RE = re.compile(rb'\d{20,}')
+
+    def _json_loads(data: bytes):
+        if _LONG_DIGITS_RE.search(data):
+            return json.loads(data)
+        return orjson.loads(data)
+
+    def _json_dumps_line(obj) -> bytes:
+        # The trailing newline is appended inside the same serializer call
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY)
+        except orjson.JSONEncodeError:
+            # orjson rejects integers beyond 64 bits, which json writes exactly
+            return json.dumps(obj, ensure_ascii=False).encode('utf-8') + b'\n'
+except ImportError:
+    from json import loads as _json_loads
+
+    def _json_dumps_line(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8') + b'\n'
+
+try:
+    # simdjson parses into lazy proxies, so peeking at the first element or
+    # re-emitting an item as a line never builds the Python dicts
+    import simdjson
+except ImportError:
+    simdjson = None
+
 logger = logging.getLogger(__name__)
 
+if simdjson is not None:
+    _JSON_ARRAY_TYPES = (list, simdjson.Array)
+    _JSON_OBJECT_TYPES = (dict, simdjson.Object)
+else:
+    _JSON_ARRAY_TYPES = (list,)
+    _JSON_OBJECT_TYPES = (dict,)
+
+
+# simdjson parsers keep their padded buffers between parses, so each thread reuses one.
+# A parser is not safe to share across concurrent parses, hence thread-local.
+_parser_local = threading.local()
+
+
+def _get_simdjson_parser():
+    """Return this thread's reusable simdjson parser"""
+    parser = getattr(_parser_local, 'parser', None)
+    if parser is None:
+        parser = _parser_local.parser = simdjson.Parser()
+    return parser
+
+
+def _parse_json_bytes(content_bytes: bytes):
+    """
+    Parse raw JSON bytes, lazily through simdjson when it is installed.
+    
+    Args:
+        content_bytes: The raw JSON document
+        
+    Returns:
+        The parsed document, either as simdjson proxies or plain Python objects
+    """
+    if simdjson is None:
+        return _json_loads(content_bytes)
+    try:
+        try:
+            return _get_simdjson_parser().parse(content_bytes)
+        except RuntimeError as e:
+            if "re-use a parser" not in str(e):
+                raise
+            # The previous document from this parser is still referenced somewhere
+            return simdjson.Parser().parse(content_bytes)
+    except ValueError as e:
+        # Surface parse failures the same way as the other parsers
+        raise json.JSONDecodeError(str(e), '', 0) from e
+    except RuntimeError as e:
+        # Documents simdjson cannot represent, e.g. integers beyond 64 bits (BIGINT_ERROR)
+        logger.info(f"simdjson could not parse the document ({e}), falling back to json")
+        return json.loads(content_bytes)
+
+
+def _ndjson_line(item) -> bytes:
+    """Serialize a single parsed JSON value as one NDJSON line, including the newline"""
+    # simdjson containers can emit their minified source without materializing
+    mini = getattr(item, 'mini', None)
+    if mini is not None:
+        return mini + b'\n'
+    return _json_dumps_line(item)
+
+
+# Number of NDJSON lines joined into a single write
+_NDJSON_BATCH_SIZE = 10000
+
+
+def _write_ndjson(out: BinaryIO, items) -> int:
+    """
+    Write parsed JSON values to a binary file object as NDJSON.
+    
+    Lines are concatenated in batches so each batch costs one write call
+    while peak memory stays bounded for very large arrays.
+    
+    Args:
+        out: The binary file object to write to
+        items: An iterable of parsed JSON values
+        
+    Returns:
+        The number of lines written
+    """
+    line_count = 0
+    lines = map(_ndjson_line, items)
+    while batch := list(itertools.islice(lines, _NDJSON_BATCH_SIZE)):
+        out.write(b''.join(batch))
+        line_count += len(batch)
+    return line_count
+
 class StorageService:
     """Service for handling file uploads to Google Cloud Storage"""
     
-    # BigQuery allowed data types for schema validation
-    BQ_ALLOWED_TYPES = [
+    # BigQuery allowed data types and modes for schema validation
+    BQ_ALLOWED_TYPES = frozenset({
         'STRING', 'INTEGER', 'FLOAT', 'BOOLEAN', 'TIMESTAMP', 
         'DATE', 'TIME', 'DATETIME', 'RECORD', 'NUMERIC', 'BYTES'
-    ]
+    })
+    BQ_ALLOWED_MODES = frozenset({'NULLABLE', 'REQUIRED', 'REPEATED'})
+    
+    # JSON arrays at least this large are streamed item by item instead of parsed whole
+    JSON_STREAMING_THRESHOLD = 32 * 1024 * 1024
+    
+    # Schema definition files are tiny; larger JSON uploads are never treated as one
+    SCHEMA_DEFINITION_MAX_BYTES = 10 * 1024 * 1024
+    
+    # Resumable upload chunk size; larger chunks mean fewer PUT round-trips per object
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    
+    # Buffer size for copying spooled uploads to local temp files
+    COPY_BUFFER_SIZE = 8 * 1024 * 1024
+    
+    # File type-specific folders and content types, keyed by file extension
+    _FOLDER = MappingProxyType({"csv": "csv/", "json": "json/"})
+    _CONTENT_TYPE = MappingProxyType({"csv": "text/csv", "json": "application/json"})
+    
+    # Bucket handles shared across the per-request service instances
+    _buckets: Dict[str, storage.Bucket] = {}
     
     def __init__(self, project_id: str):
         """
@@ -42,17 +187,26 @@ class StorageService:
             project_id: The Google Cloud project ID
         """
         self.project_id = project_id
-        self.client = storage.Client(project=project_id)
         
         # Default bucket name follows the specified pattern
         self.bucket_name = f"{project_id}_psearch_raw"
         
         # File type-specific folders
-        self.csv_folder = "csv/"
-        self.json_folder = "json/"
+        self.csv_folder = self._FOLDER["csv"]
+        self.json_folder = self._FOLDER["json"]
+        
+        # Reuse the bucket handle (and its client) once the bucket is known to exist
+        cached_bucket = self._buckets.get(self.bucket_name)
+        if cached_bucket is not None:
+            self.bucket = cached_bucket
+            self.client = cached_bucket.client
+            return
+        
+        self.client = storage.Client(project=project_id)
         
         # Ensure the bucket exists
         self._ensure_bucket_exists()
+        self._buckets[self.bucket_name] = self.bucket
     
     def _ensure_bucket_exists(self):
         """Ensure the storage bucket exists, creating it if necessary"""
@@ -87,193 +241,298 @@ class StorageService:
         # Determine file extension and select appropriate folder
         file_extension = file.filename.split(".")[-1].lower()
         
-        if file_extension == "csv":
-            folder_prefix = self.csv_folder
-        elif file_extension == "json":
-            folder_prefix = self.json_folder
-        else:
-            folder_prefix = "other/"
+        folder_prefix = self._FOLDER.get(file_extension, "other/")
         
         # Generate a unique object name with folder structure
         object_name = f"{folder_prefix}{file_id}.{file_extension}"
         
         # Create a blob in the bucket
-        blob = self.bucket.blob(object_name)
+        blob = self.bucket.blob(object_name, chunk_size=self.UPLOAD_CHUNK_SIZE)
         
         # Set content type based on file extension
-        content_type_map = {
-            "csv": "text/csv",
-            "json": "application/json",
-        }
-        content_type = content_type_map.get(file_extension, "application/octet-stream")
+        content_type = self._CONTENT_TYPE.get(file_extension, "application/octet-stream")
         blob.content_type = content_type
         
         try:
-            # Create a temporary file path
-            temp_fd, temp_file_path = tempfile.mkstemp(suffix=f'.{file_extension}')
-            os.close(temp_fd) # Close the file descriptor, we'll open it properly
+            # Parsing, conversion and the GCS upload all block, so run them off the event loop
+            await asyncio.to_thread(
+                self._process_and_upload, file.file, file.filename, file_extension, blob, content_type
+            )
+            
+            # Build the GCS URI
+            gcs_uri = f"gs://{self.bucket_name}/{object_name}"
+            
+            # Store in our file map
+            logger.info(f"Uploaded file {file.filename} to {gcs_uri}")
+            return gcs_uri
+        except Exception as e:
+            logger.error(f"Error uploading file: {str(e)}")
+            raise
+
+    def _process_and_upload(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        file_extension: str,
+        blob: storage.Blob,
+        content_type: str,
+    ) -> None:
+        """
+        Convert an uploaded file where needed and upload it to GCS.
+        
+        This does blocking parsing and network I/O, so it is run in a worker thread.
+        
+        Args:
+            stream: The binary file object backing the upload
+            filename: The original name of the uploaded file
+            file_extension: The lower-cased file extension
+            blob: The destination blob
+            content_type: The content type to upload with
+        """
+        # Whole-document JSON is converted in memory and NDJSON is sent as-is; everything else goes through a temp file
+        temp_file_path = None
+        ndjson_buffer = None
+        
+        if file_extension == "json" and self._should_stream_json(stream):
+            # Large arrays are converted one item at a time; schema definition files are always small
+            temp_file_path = self._create_temp_file(file_extension)
+            try:
+                item_count = self._stream_json_array_to_ndjson(stream, temp_file_path)
+                logger.info(f"Streamed JSON array ({item_count} items) to NDJSON for file {filename} in {temp_file_path}")
+            except Exception as stream_err:
+                logger.error(f"Error streaming JSON file {filename} to NDJSON: {stream_err}. Writing original content.")
+                with open(temp_file_path, 'wb') as temp_file:
+                    stream.seek(0)
+                    shutil.copyfileobj(stream, temp_file, self.COPY_BUFFER_SIZE)
 
-            logger.info(f"Created temporary file for processing: {temp_file_path}")
+        elif file_extension == "json" and self._looks_like_ndjson(stream):
+            # Already newline-delimited, so upload the spooled file as-is without parsing or copying
+            logger.info(f"JSON file {filename} is already NDJSON, uploading without conversion")
+            ndjson_buffer = stream
 
-            if file_extension == "json":
-                # Read the entire JSON file, parse, and write as NDJSON to the temp file
-                ndjson_content_written = False
+        elif file_extension == "json":
+            # Read the entire JSON file, parse, and build the NDJSON payload in memory
+            ndjson_content_written = False
+            # Read once up front; the fallbacks below reuse these bytes instead of re-reading the upload
+            stream.seek(0)
+            content_bytes = stream.read()
+            logger.info(f"Read {len(content_bytes)} bytes from uploaded JSON file {filename}")
+            try:
+                # Advanced error repair for common JSON issues
                 try:
-                    # Ensure reading from start
-                    await file.seek(0)
-                    content_bytes = await file.read()
-                    logger.info(f"Read {len(content_bytes)} bytes from uploaded JSON file {file.filename}")
-
-                    # Decode content, assuming UTF-8
-                    content_str = content_bytes.decode('utf-8')
+                    # Try standard JSON parse first, directly on the raw bytes
+                    data = _parse_json_bytes(content_bytes)
                     
-                    # Advanced error repair for common JSON issues
-                    try:
-                        # Try standard JSON parse first
-                        data = json.loads(content_str)
+                    # Check if this is a schema definition file, ruling most uploads out from the raw bytes
+                    if self._may_be_schema_definition(content_bytes) and self._is_schema_definition(data):
+                        logger.info(f"Detected schema definition file: {filename}")
+                        is_valid, errors = self._validate_schema_definition(data)
+                        if not is_valid:
+                            for error in errors:
+                                logger.warning(f"Schema validation warning: {error}")
+                        
+                        # Special handling for schema files - always process as JSONL regardless of structure
+                        ndjson_buffer = io.BytesIO()
+                        _write_ndjson(ndjson_buffer, data)
+                        logger.info(f"Converted schema definition to JSONL format with {len(data)} fields")
+                        ndjson_content_written = True
+                        # Skip the rest of the JSON processing since we've handled it
+                        data = None
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Initial JSON parse failed: {e}. Attempting repair...")
+                    # If we get "No object found when new array is started" error, try to fix it
+                    if "No object found when new array is started" in str(e) or "BeginArray returned false" in str(e):
+                        # Try to handle the case where array brackets might be missing or malformed
+                        # Work on the raw bytes so the whole payload is never decoded to str
+                        repaired = content_bytes.strip()
+                        
+                        # Check if it starts with '[' - if not, add it
+                        if not repaired.startswith(b'['):
+                            repaired = b'[' + repaired
+                            logger.info("Added missing opening bracket '[' to JSON")
                         
-                        # Check if this is a schema definition file
-                        if self._is_schema_definition(data):
-                            logger.info(f"Detected schema definition file: {file.filename}")
-                            is_valid, errors = self._validate_schema_definition(data)
-                            if not is_valid:
-                                for error in errors:
-                                    logger.warning(f"Schema validation warning: {error}")
+                        # Check if it ends with ']' - if not, add it
+                        if not repaired.endswith(b']'):
+                            repaired = repaired + b']'
+                            logger.info("Added missing closing bracket ']' to JSON")
                             
-                            # Special handling for schema files - always process as JSONL regardless of structure
-                            with open(temp_file_path, 'w', encoding='utf-8') as temp_file:
-                                for item in data:
-                                    json.dump(item, temp_file, ensure_ascii=False)
-                                    temp_file.write('\n')
-                            logger.info(f"Converted schema definition to JSONL format with {len(data)} fields")
-                            ndjson_content_written = True
-                            # Skip the rest of the JSON processing since we've handled it
-                            data = None
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Initial JSON parse failed: {e}. Attempting repair...")
-                        # If we get "No object found when new array is started" error, try to fix it
-                        if "No object found when new array is started" in str(e) or "BeginArray returned false" in str(e):
-                            # Try to handle the case where array brackets might be missing or malformed
-                            content_str = content_str.strip()
+                        # Handle malformed JSON arrays by checking for missing commas or extra commas
+                        try:
+                            # Try to parse the repaired content
+                            data = _json_loads(repaired)
+                            logger.info("JSON repair successful!")
+                        except json.JSONDecodeError as e2:
+                            # If still failing, try line-by-line parsing method
+                            logger.warning(f"First repair attempt failed: {e2}. Trying alternate method...")
                             
-                            # Check if it starts with '[' - if not, add it
-                            if not content_str.startswith('['):
-                                content_str = '[' + content_str
-                                logger.info("Added missing opening bracket '[' to JSON")
+                            # Drop the outer [ and ] to treat each line as separate object
+                            lines = repaired[1:-1].split(b'\n')
                             
-                            # Check if it ends with ']' - if not, add it
-                            if not content_str.endswith(']'):
-                                content_str = content_str + ']'
-                                logger.info("Added missing closing bracket ']' to JSON")
-                                
-                            # Handle malformed JSON arrays by checking for missing commas or extra commas
-                            try:
-                                # Try to parse the repaired content
-                                data = json.loads(content_str)
-                                logger.info("JSON repair successful!")
-                            except json.JSONDecodeError as e2:
-                                # If still failing, try line-by-line parsing method
-                                logger.warning(f"First repair attempt failed: {e2}. Trying alternate method...")
-                                
-                                # Replace first [ and last ] to treat each line as separate object
-                                lines = content_str.replace('[', '', 1)
-                                if lines.endswith(']'):
-                                    lines = lines[:-1]
+                            # Create an array of all valid JSON objects in the file
+                            data = []
+                            for line in lines:
+                                line = line.strip()
+                                if not line or line in (b',', b']', b'['):
+                                    continue
                                     
-                                lines = lines.split('\n')
-                                
-                                # Create an array of all valid JSON objects in the file
-                                data = []
-                                for line in lines:
-                                    line = line.strip()
-                                    if not line or line == ',' or line == ']' or line == '[':
-                                        continue
-                                        
-                                    # Remove trailing commas which are invalid in JSON
-                                    if line.endswith(','):
-                                        line = line[:-1]
-                                        
-                                    try:
-                                        item = json.loads(line)
-                                        data.append(item)
-                                    except json.JSONDecodeError:
-                                        logger.warning(f"Skipping invalid JSON line: {line[:50]}...")
-                                
-                                if not data:
-                                    # If all parsing attempts failed, raise the original error
-                                    raise e
-                                
-                                logger.info(f"Extracted {len(data)} valid JSON objects using line-by-line parsing")
-                        else:
-                            # For other JSON errors, just re-raise
-                            raise
-                    
-                    logger.info(f"Successfully parsed JSON content for {file.filename}")
-
-                    # Open the temp file in write mode with UTF-8 encoding
-                    with open(temp_file_path, 'w', encoding='utf-8') as temp_file:
-                        if isinstance(data, list):
+                                # Remove trailing commas which are invalid in JSON
+                                if line.endswith(b','):
+                                    line = line[:-1]
+                                    
+                                try:
+                                    item = _json_loads(line)
+                                    data.append(item)
+                                except json.JSONDecodeError:
+                                    logger.warning(f"Skipping invalid JSON line: {line[:50]!r}...")
+                            
                             if not data:
-                                logger.warning(f"JSON file {file.filename} contains an empty array.")
-                            else:
-                                for i, item in enumerate(data):
-                                    # Use ensure_ascii=False for broader character support
-                                    json.dump(item, temp_file, ensure_ascii=False)
-                                    temp_file.write('\n')
-                                logger.info(f"Converted JSON array ({len(data)} items) to NDJSON for file {file.filename} in {temp_file_path}")
-                                ndjson_content_written = True
-                        elif isinstance(data, dict):
-                            # If it's not a list (e.g., single object), write it directly
-                            json.dump(data, temp_file, ensure_ascii=False)
-                            temp_file.write('\n')
-                            logger.warning(f"Uploaded JSON file {file.filename} was a single object, wrote as one line NDJSON in {temp_file_path}")
-                            ndjson_content_written = True
-                        else:
-                             logger.error(f"Parsed JSON content from {file.filename} is neither a list nor an object.")
-                             # Write original content as fallback
-                             temp_file.write(content_str)
-                             logger.warning(f"Wrote original content to {temp_file_path} due to unexpected JSON structure.")
-
-                except json.JSONDecodeError as json_err:
-                    logger.error(f"Failed to parse uploaded JSON file {file.filename}: {json_err}. Writing original content.")
-                    # Write the original, potentially invalid content directly to the temp file (binary mode)
-                    with open(temp_file_path, 'wb') as temp_file:
-                        await file.seek(0)
-                        temp_file.write(await file.read())
-                except Exception as proc_err:
-                    logger.error(f"Error processing JSON file {file.filename} for NDJSON conversion: {proc_err}. Writing original content.")
-                     # Write the original content directly to the temp file (binary mode)
-                    with open(temp_file_path, 'wb') as temp_file:
-                        await file.seek(0)
-                        temp_file.write(await file.read())
+                                # If all parsing attempts failed, raise the original error
+                                raise e
+                            
+                            logger.info(f"Extracted {len(data)} valid JSON objects using line-by-line parsing")
+                    else:
+                        # For other JSON errors, just re-raise
+                        raise
+                
+                logger.info(f"Successfully parsed JSON content for {filename}")
 
-            else:
-                # For non-JSON files (like CSV), write directly to the temp file in binary mode
-                with open(temp_file_path, 'wb') as temp_file:
-                    await file.seek(0) # Ensure reading from start
-                    chunk_size = 1024 * 1024  # 1 MB chunks
-                    while chunk := await file.read(chunk_size):
-                        temp_file.write(chunk)
-                logger.info(f"Wrote non-JSON file {file.filename} directly to {temp_file_path}")
-
-            # --- Uploading ---
-            logger.info(f"Uploading processed file from {temp_file_path} to GCS object {object_name}")
+                # Build the NDJSON payload in memory; serialized items are already UTF-8 bytes
+                ndjson_buffer = io.BytesIO()
+                if isinstance(data, _JSON_ARRAY_TYPES):
+                    if not data:
+                        logger.warning(f"JSON file {filename} contains an empty array.")
+                    else:
+                        _write_ndjson(ndjson_buffer, data)
+                        logger.info(f"Converted JSON array ({len(data)} items) to NDJSON for file {filename}")
+                        ndjson_content_written = True
+                elif isinstance(data, _JSON_OBJECT_TYPES):
+                    # If it's not a list (e.g., single object), write it directly
+                    ndjson_buffer.write(_ndjson_line(data))
+                    logger.warning(f"Uploaded JSON file {filename} was a single object, wrote as one line NDJSON")
+                    ndjson_content_written = True
+                else:
+                    logger.error(f"Parsed JSON content from {filename} is neither a list nor an object.")
+                    # Write original content as fallback
+                    ndjson_buffer.write(content_bytes)
+                    logger.warning(f"Kept original content for {filename} due to unexpected JSON structure.")
+
+            except json.JSONDecodeError as json_err:
+                logger.error(f"Failed to parse uploaded JSON file {filename}: {json_err}. Writing original content.")
+                # Upload the original, potentially invalid content as-is
+                ndjson_buffer = io.BytesIO(content_bytes)
+            except Exception as proc_err:
+                logger.error(f"Error processing JSON file {filename} for NDJSON conversion: {proc_err}. Writing original content.")
+                # Upload the original content as-is
+                ndjson_buffer = io.BytesIO(content_bytes)
+
+        else:
+            # For non-JSON files (like CSV), write directly to the temp file in binary mode
+            temp_file_path = self._create_temp_file(file_extension)
+            with open(temp_file_path, 'wb') as temp_file:
+                # Copy straight from the spooled file rather than through awaited chunk reads
+                stream.seek(0) # Ensure reading from start
+                shutil.copyfileobj(stream, temp_file, self.COPY_BUFFER_SIZE)
+            logger.info(f"Wrote non-JSON file {filename} directly to {temp_file_path}")
+
+        # --- Uploading ---
+        if ndjson_buffer is not None:
+            logger.info(f"Uploading processed JSON from memory to GCS object {blob.name}")
+            # Upload the payload directly, with no temp file round-trip
+            size = ndjson_buffer.seek(0, io.SEEK_END)
+            ndjson_buffer.seek(0)
+            blob.upload_from_file(ndjson_buffer, size=size, content_type=content_type)
+        else:
+            logger.info(f"Uploading processed file from {temp_file_path} to GCS object {blob.name}")
             # Upload the processed temp file to GCS
             blob.upload_from_filename(temp_file_path)
-            logger.info(f"Successfully uploaded to {object_name}")
             
             # Clean up the temp file
             os.unlink(temp_file_path)
+        logger.info(f"Successfully uploaded to {blob.name}")
+
+    def _create_temp_file(self, file_extension: str) -> str:
+        """
+        Create an empty temporary file for processing an upload.
+        
+        Args:
+            file_extension: The extension of the uploaded file
             
-            # Build the GCS URI
-            gcs_uri = f"gs://{self.bucket_name}/{object_name}"
+        Returns:
+            The path of the temporary file
+        """
+        temp_fd, temp_file_path = tempfile.mkstemp(suffix=f'.{file_extension}')
+        os.close(temp_fd) # Close the file descriptor, we'll open it properly
+        logger.info(f"Created temporary file for processing: {temp_file_path}")
+        return temp_file_path
+    
+    def _should_stream_json(self, stream: BinaryIO) -> bool:
+        """
+        Decide whether an uploaded JSON file should be streamed rather than parsed whole.
+        
+        Args:
+            stream: The binary file object backing the upload
             
-            # Store in our file map
-            logger.info(f"Uploaded file {file.filename} to {gcs_uri}")
-            return gcs_uri
-        except Exception as e:
-            logger.error(f"Error uploading file: {str(e)}")
-            raise
+        Returns:
+            True if the file is a top-level array of at least JSON_STREAMING_THRESHOLD bytes
+        """
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+        if size < self.JSON_STREAMING_THRESHOLD:
+            return False
+        
+        # Only arrays can be streamed; check the first non-whitespace byte
+        first_byte = b""
+        while True:
+            chunk = stream.read(1024)
+            if not chunk:
+                break
+            stripped = chunk.lstrip()
+            if stripped:
+                first_byte = stripped[:1]
+                break
+        stream.seek(0)
+        return first_byte == b"["
+    
+    def _looks_like_ndjson(self, stream: BinaryIO) -> bool:
+        """
+        Check whether an uploaded JSON file is already newline-delimited.
+        
+        Args:
+            stream: The binary file object backing the upload
+            
+        Returns:
+            True if the file starts with an object that is followed by another object on the next line
+        """
+        stream.seek(0)
+        head = stream.read(64 * 1024).lstrip()
+        stream.seek(0)
+        if not head.startswith(b"{"):
+            return False
+        return b"}\n{" in head or b"}\r\n{" in head
+    
+    def _stream_json_array_to_ndjson(self, stream: BinaryIO, temp_file_path: str) -> int:
+        """
+        Convert a top-level JSON array to NDJSON without holding the whole document in memory.
+        
+        Args:
+            stream: The binary file object backing the upload, positioned at the start
+            temp_file_path: Path of the file to write the NDJSON lines to
+            
+        Returns:
+            The number of items written
+        """
+        try:
+            with open(temp_file_path, 'wb') as temp_file:
+                return _write_ndjson(temp_file, ijson.items(stream, 'item', use_float=True))
+        except ijson.JSONError as e:
+            if "integer overflow" not in str(e):
+                raise
+            # The C backend rejects integers beyond 64 bits; the pure Python one keeps them exact
+            logger.info("JSON array holds integers beyond 64 bits, re-streaming with the Python ijson backend")
+            stream.seek(0)
+            with open(temp_file_path, 'wb') as temp_file:
+                return _write_ndjson(temp_file, ijson.get_backend('python').items(stream, 'item', use_float=True))
 
     def get_file_uri(self, file_id: str, file_type: str) -> Optional[str]:
         """
@@ -290,11 +549,8 @@ class StorageService:
         
         file_type_lower = file_type.lower()
         
-        if file_type_lower == "csv":
-            folder_prefix = self.csv_folder
-        elif file_type_lower == "json":
-            folder_prefix = self.json_folder
-        else:
+        folder_prefix = self._FOLDER.get(file_type_lower)
+        if folder_prefix is None:
             logger.error(f"Unsupported file_type provided: {file_type}")
             return None # Or raise an error, depending on desired behavior
             
@@ -304,22 +560,22 @@ class StorageService:
         logger.info(f"Constructed expected GCS URI: {gcs_uri}")
         
         try:
-            # Check if the specific blob exists
-            blob = self.bucket.blob(object_name)
-            if blob.exists():
+            # Fetch the blob's metadata in a single request; None means it does not exist
+            if self.bucket.get_blob(object_name) is not None:
                 logger.info(f"Confirmed file exists at {gcs_uri}")
                 return gcs_uri
             else:
-                # Log specific blob names for debugging if not found
-                logger.warning(f"File not found at the expected path: {gcs_uri}. Checking blobs...")
-                try:
-                    blobs = list(self.bucket.list_blobs(prefix=folder_prefix))
-                    if blobs:
-                         logger.info(f"Blobs found in {folder_prefix}: {[b.name for b in blobs]}")
-                    else:
-                         logger.info(f"No blobs found in {folder_prefix}")
-                except Exception as list_e:
-                    logger.error(f"Error listing blobs during debug check: {list_e}")
+                logger.warning(f"File not found at the expected path: {gcs_uri}")
+                # Listing the folder is only for debugging, so skip the extra request otherwise
+                if logger.isEnabledFor(logging.DEBUG):
+                    try:
+                        blobs = list(self.bucket.list_blobs(prefix=folder_prefix, max_results=20))
+                        if blobs:
+                            logger.debug(f"Blobs found in {folder_prefix}: {[b.name for b in blobs]}")
+                        else:
+                            logger.debug(f"No blobs found in {folder_prefix}")
+                    except Exception as list_e:
+                        logger.error(f"Error listing blobs during debug check: {list_e}")
                 return None
         except Exception as e:
             logger.error(f"Error finding file {file_id} in GCS: {str(e)}")
@@ -329,6 +585,22 @@ class StorageService:
     # If deletion is needed, it should be reimplemented to accept file_type
     # or discover the file path similarly to get_file_uri.
 
+    def _may_be_schema_definition(self, content_bytes: bytes) -> bool:
+        """
+        Cheap byte-level pre-check for schema definition files.
+        
+        Args:
+            content_bytes: The raw JSON upload
+            
+        Returns:
+            False if the upload cannot be a schema definition, True if it needs a closer look
+        """
+        if len(content_bytes) > self.SCHEMA_DEFINITION_MAX_BYTES:
+            return False
+        
+        # Schema definitions are always top-level arrays
+        return content_bytes[:4096].lstrip().startswith(b'[')
+    
     def _is_schema_definition(self, content_json) -> bool:
         """
         Detect if JSON content is likely a schema definition.
@@ -340,7 +612,7 @@ class StorageService:
             True if the content appears to be a schema definition, False otherwise
         """
         # Must be a list with at least one item
-        if not isinstance(content_json, list) or len(content_json) == 0:
+        if not isinstance(content_json, _JSON_ARRAY_TYPES) or len(content_json) == 0:
             return False
         
         # Check for schema-like structure
@@ -348,7 +620,7 @@ class StorageService:
         sample = content_json[0]
         
         # If it's a dictionary with common schema fields, it's likely a schema definition
-        if isinstance(sample, dict):
+        if isinstance(sample, _JSON_OBJECT_TYPES):
             # Check if most of the schema indicators are present
             indicators_present = sum(1 for key in schema_indicators if key in sample)
             return indicators_present >= 2  # At least name and type should be present
@@ -365,26 +637,26 @@ class StorageService:
         Returns:
             A tuple of (is_valid, errors)
         """
-        valid = True
         errors = []
+        allowed_types = self.BQ_ALLOWED_TYPES
+        allowed_modes = self.BQ_ALLOWED_MODES
         
         for i, item in enumerate(schema_items):
+            has_type = 'type' in item
+            
             # Check required fields
-            if not all(key in item for key in ['name', 'type']):
-                valid = False
+            if not (has_type and 'name' in item):
                 errors.append(f"Item {i}: Missing required fields (name, type)")
             
             # Validate type values against BigQuery allowed types
-            if 'type' in item and item['type'] not in self.BQ_ALLOWED_TYPES:
-                valid = False
+            if has_type and item['type'] not in allowed_types:
                 errors.append(f"Item {i}: Invalid type '{item['type']}'")
                 
             # Validate mode values if present
-            if 'mode' in item and item['mode'] not in ['NULLABLE', 'REQUIRED', 'REPEATED']:
-                valid = False
+            if 'mode' in item and item['mode'] not in allowed_modes:
                 errors.append(f"Item {i}: Invalid mode '{item['mode']}'")
         
-        return valid, errors
+        return not errors, errors
         
     def list_buckets(self) -> List[Dict[str, Any]]:
         """
@@ -15,7 +15,9 @@
 
 from google.cloud import bigquery, firestore, storage
 import pandas as pd
+import logging
 import os
+import tempfile
 from dotenv import load_dotenv
 import time
 
@@ -28,237 +30,215 @@ DATASET = os.getenv('bq_dataset')
 TABLE = os.getenv('bq_table')
 ENRICHED_TABLE = os.getenv('bq_enriched_table')
 FIRESTORE_COLLECTION = os.getenv('firestore_collection')
+IMG_BUCKET = os.getenv('psearch_img_bucket')
 
-def fetch_all_products_from_bigquery():
-    """Fetch all products from BigQuery."""
-    client = bigquery.Client(project=PROJECT_ID)
-    
-    query = f"""
-    SELECT *
-    FROM `{PROJECT_ID}.{DATASET}.{TABLE}`
-    ORDER BY id
-    """
-    
-    print("Fetching all products from BigQuery...")
-    df = client.query(query).to_dataframe()
-    print(f"Fetched {len(df)} products from BigQuery")
-    return df
+# Per-document dumps are only emitted at DEBUG level (log_level=DEBUG)
+logger = logging.getLogger(__name__)
 
-def fetch_processed_products_from_firestore():
-    """Fetch all successfully processed products from Firestore."""
-    db = firestore.Client(project=PROJECT_ID)
-    collection = db.collection(FIRESTORE_COLLECTION)
-    
-    print("Fetching processed products from Firestore...")
-    # Query only completed products
-    docs = collection.where(filter=firestore.FieldFilter('status', '==', 'completed')).stream()
+# Shared Firestore client for the consolidation run
+firestore_client = firestore.Client(project=PROJECT_ID)
+
+# BigQuery client shared by the staging loads and the server-side join
+bigquery_client = bigquery.Client(project=PROJECT_ID)
+
+PROCESSED_FIELDS = ['image_uri', 'description', 'completed_at', 'status', 'started_at', 'updated_at']
+FAILED_FIELDS = ['error_message', 'retry_count', 'failed_at', 'status', 'started_at', 'updated_at']
+# Columns the consolidation adds to each product row
+ENRICHMENT_COLUMNS = [
+    'image_uri', 'description', 'completed_at', 'error_message', 'retry_count',
+    'failed_at', 'started_at', 'updated_at', 'processing_status',
+]
+
+def fetch_finished_products_from_firestore():
+    """Fetch completed and permanently failed products from Firestore with one query."""
+    collection = firestore_client.collection(FIRESTORE_COLLECTION)
+    
+    print("Fetching processed and failed products from Firestore...")
+    # Query both final states at once and split them by status
+    # Only read the status fields, leaving the nested product_data on the server
+    docs = (
+        collection
+        .where(filter=firestore.FieldFilter('status', 'in', ['completed', 'permanently_failed']))
+        .select(list(dict.fromkeys(PROCESSED_FIELDS + FAILED_FIELDS)))
+        .stream()
+    )
     
     processed_products = []
+    failed_products = []
     for doc in docs:
         try:
             product_id = int(doc.id)  # Convert string ID to int
             data = doc.to_dict()
-            print(f"\nDebug - Firestore document for product {product_id}:")
-            print(f"Data: {data}")
-            
-            # Extract data from the nested product_data if it exists
-            product_data = data.get('product_data', {})
+            logger.debug("Firestore document for product %s: %s", product_id, data)
             
-            # Create base product info
-            product_info = {
-                'id': product_id,
-                'image_uri': data.get('image_uri'),
-                'description': data.get('description'),
-                'completed_at': data.get('completed_at'),
-                'status': data.get('status'),
-                'started_at': data.get('started_at'),
-                'updated_at': data.get('updated_at')
-            }
+            if data.get('status') == 'completed':
+                fields, products = PROCESSED_FIELDS, processed_products
+            else:
+                fields, products = FAILED_FIELDS, failed_products
             
-            # Add all product_data fields except 'id' which we already have
-            if product_data:
-                product_data.pop('id', None)  # Remove id from product_data if it exists
-                product_info.update(product_data)
-            
-            processed_products.append(product_info)
+            # Product attributes come from the BigQuery join, so the nested
+            # product_data copy is not needed here
+            products.append({'id': product_id, **{field: data.get(field) for field in fields}})
         except Exception as e:
             print(f"Error processing document {doc.id}: {str(e)}")
             continue
     
     print(f"\nFetched {len(processed_products)} processed products from Firestore")
     if processed_products:
-        print("\nSample of first processed product:")
-        print(processed_products[0])
-    
-    return pd.DataFrame(processed_products) if processed_products else pd.DataFrame(columns=['id', 'image_uri', 'description', 'completed_at', 'status', 'started_at', 'updated_at'])
-
-def fetch_failed_products_from_firestore():
-    """Fetch all permanently failed products from Firestore."""
-    db = firestore.Client(project=PROJECT_ID)
-    collection = db.collection(FIRESTORE_COLLECTION)
-    
-    print("\nFetching failed products from Firestore...")
-    # Query permanently failed products
-    docs = collection.where(filter=firestore.FieldFilter('status', '==', 'permanently_failed')).stream()
-    
-    failed_products = []
-    for doc in docs:
-        try:
-            product_id = int(doc.id)
-            data = doc.to_dict()
-            product_data = data.get('product_data', {})
-            
-            # Create base product info
-            product_info = {
-                'id': product_id,
-                'error_message': data.get('error_message'),
-                'retry_count': data.get('retry_count'),
-                'failed_at': data.get('failed_at'),
-                'status': data.get('status'),
-                'started_at': data.get('started_at'),
-                'updated_at': data.get('updated_at')
-            }
-            
-            # Add all product_data fields except 'id'
-            if product_data:
-                product_data.pop('id', None)  # Remove id from product_data if it exists
-                product_info.update(product_data)
-            
-            failed_products.append(product_info)
-        except Exception as e:
-            print(f"Error processing document {doc.id}: {str(e)}")
-            continue
-    
+        logger.debug("Sample of first processed product: %s", processed_products[0])
     print(f"Fetched {len(failed_products)} failed products from Firestore")
-    return pd.DataFrame(failed_products) if failed_products else pd.DataFrame(columns=['id', 'error_message', 'retry_count', 'failed_at', 'status', 'started_at', 'updated_at'])
-
-def upload_to_gcs(df, filename):
-    """Upload DataFrame as CSV to Google Cloud Storage."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(os.getenv('psearch_img_bucket'))
-    
-    # Save DataFrame to a temporary CSV file
-    temp_filename = f"temp_{filename}"
-    df.to_csv(temp_filename, index=False)
-    
-    # Upload to GCS
-    blob = bucket.blob(f"exports/{filename}")
-    blob.upload_from_filename(temp_filename)
     
-    # Clean up temporary file
-    os.remove(temp_filename)
-    
-    print(f"Uploaded consolidated results to gs://{os.getenv('psearch_img_bucket')}/exports/{filename}")
+    processed_df = pd.DataFrame.from_records(processed_products, columns=['id'] + PROCESSED_FIELDS)
+    failed_df = pd.DataFrame.from_records(failed_products, columns=['id'] + FAILED_FIELDS)
+    return processed_df, failed_df
 
 def write_to_bigquery(df, table_name):
     """Write DataFrame to BigQuery table."""
-    client = bigquery.Client(project=PROJECT_ID)
     table_id = f"{PROJECT_ID}.{DATASET}.{table_name}"
     
     print(f"Writing {len(df)} rows to BigQuery table: {table_id}")
     
+    # Encode the frame once as Parquet and stage it in Cloud Storage for the load job
+    bucket = storage.Client().bucket(IMG_BUCKET)
+    blob = bucket.blob(f"staging/{table_name}_{int(time.time())}.parquet")
+    with tempfile.NamedTemporaryFile(suffix=".parquet") as parquet_file:
+        df.to_parquet(parquet_file.name, engine="pyarrow", compression="snappy", index=False)
+        blob.upload_from_filename(parquet_file.name)
+    
     # Configure the job
     job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
         write_disposition="WRITE_TRUNCATE",  # Overwrite the table if it exists
     )
     
-    job = client.load_table_from_dataframe(
-        df, table_id, job_config=job_config
+    job = bigquery_client.load_table_from_uri(
+        f"gs://{IMG_BUCKET}/{blob.name}", table_id, job_config=job_config
     )
     
     # Wait for the job to complete
     job.result()
+    blob.delete()
     print(f"✓ Successfully wrote {len(df)} rows to {table_id}")
 
+def to_staging_frame(df, string_columns=(), int_columns=(), timestamp_columns=()):
+    """Give the Firestore columns stable types so the staging tables load with the right schema."""
+    staged = pd.DataFrame({'id': df['id'].astype('int64')})
+    for col in string_columns:
+        staged[col] = df[col].astype('string')
+    for col in int_columns:
+        staged[col] = df[col].astype('Int64')
+    for col in timestamp_columns:
+        staged[col] = pd.to_datetime(df[col], utc=True)
+    return staged
+
 def consolidate_results():
     """Consolidate results from BigQuery and Firestore."""
-    # Fetch all data
-    bq_df = fetch_all_products_from_bigquery()
-    processed_df = fetch_processed_products_from_firestore()
-    failed_df = fetch_failed_products_from_firestore()
-    
-    print("\nDebug - Processed DataFrame Info:")
-    print(processed_df.info())
-    if not processed_df.empty:
-        print("\nSample of processed data:")
-        print(processed_df.head())
-    
-    # Initialize merged DataFrame with BigQuery data
-    merged_df = bq_df.copy()
-    
-    # Add columns for processing data with default values
-    merged_df['image_uri'] = None
-    merged_df['description'] = None
-    merged_df['completed_at'] = None
-    merged_df['error_message'] = None
-    merged_df['retry_count'] = 0
-    merged_df['failed_at'] = None
-    merged_df['started_at'] = None
-    merged_df['updated_at'] = None
-    merged_df['processing_status'] = 'pending'
-    
-    # Update processed products if any exist
-    if not processed_df.empty:
-        print("\nUpdating processed products...")
-        processed_columns = ['image_uri', 'description', 'completed_at', 'started_at', 'updated_at']
-        
-        for _, row in processed_df.iterrows():
-            product_id = row['id']
-            mask = merged_df['id'] == product_id
-            print(f"\nUpdating product {product_id}:")
-            print(f"Original data: {merged_df.loc[mask, processed_columns].to_dict('records')}")
-            print(f"New data: {row[processed_columns].to_dict()}")
-            
-            # Update all relevant columns
-            for col in processed_columns:
-                if col in row and pd.notna(row[col]):
-                    merged_df.loc[mask, col] = row[col]
-            
-            merged_df.loc[mask, 'processing_status'] = 'completed'
-    
-    # Update failed products if any exist
-    if not failed_df.empty:
-        print("\nUpdating failed products...")
-        failed_columns = ['error_message', 'retry_count', 'failed_at', 'started_at', 'updated_at']
+    processed_df, failed_df = fetch_finished_products_from_firestore()
+    
+    if logger.isEnabledFor(logging.DEBUG) and not processed_df.empty:
+        logger.debug("Sample of processed data:\n%s", processed_df.head())
+    
+    dataset_id = f"{PROJECT_ID}.{DATASET}"
+    enriched_table_id = f"{dataset_id}.{ENRICHED_TABLE}"
+    
+    # Product columns named like a processing column are replaced by it
+    product_columns = {field.name for field in bigquery_client.get_table(f"{dataset_id}.{TABLE}").schema}
+    replaced_columns = [col for col in ENRICHMENT_COLUMNS if col in product_columns]
+    product_select = f"b.* EXCEPT ({', '.join(replaced_columns)})" if replaced_columns else "b.*"
+    
+    # Stage only the Firestore results; the product table never leaves BigQuery
+    processed_table = f"{ENRICHED_TABLE}_processed_staging"
+    failed_table = f"{ENRICHED_TABLE}_failed_staging"
+    try:
+        write_to_bigquery(
+            to_staging_frame(
+                processed_df,
+                string_columns=['image_uri', 'description'],
+                timestamp_columns=['completed_at', 'started_at', 'updated_at'],
+            ),
+            processed_table,
+        )
+        write_to_bigquery(
+            to_staging_frame(
+                failed_df,
+                string_columns=['error_message'],
+                int_columns=['retry_count'],
+                timestamp_columns=['failed_at', 'started_at', 'updated_at'],
+            ),
+            failed_table,
+        )
         
-        for _, row in failed_df.iterrows():
-            product_id = row['id']
-            mask = merged_df['id'] == product_id
-            print(f"\nUpdating failed product {product_id}:")
-            print(f"Original data: {merged_df.loc[mask, failed_columns].to_dict('records')}")
-            print(f"New data: {row[failed_columns].to_dict()}")
-            
-            # Update all relevant columns
-            for col in failed_columns:
-                if col in row and pd.notna(row[col]):
-                    merged_df.loc[mask, col] = row[col]
-            
-            merged_df.loc[mask, 'processing_status'] = 'failed'
+        # Join server-side; a failure record takes precedence over a completion
+        print(f"\nJoining products with processing results into {enriched_table_id}...")
+        query = f"""
+        CREATE OR REPLACE TABLE `{enriched_table_id}` AS
+        SELECT
+          {product_select},
+          p.image_uri,
+          p.description,
+          p.completed_at,
+          f.error_message,
+          COALESCE(f.retry_count, 0) AS retry_count,
+          f.failed_at,
+          COALESCE(f.started_at, p.started_at) AS started_at,
+          COALESCE(f.updated_at, p.updated_at) AS updated_at,
+          CASE
+            WHEN f.id IS NOT NULL THEN 'failed'
+            WHEN p.id IS NOT NULL THEN 'completed'
+            ELSE 'pending'
+          END AS processing_status
+        FROM `{dataset_id}.{TABLE}` b
+        LEFT JOIN `{dataset_id}.{processed_table}` p USING (id)
+        LEFT JOIN `{dataset_id}.{failed_table}` f USING (id)
+        """
+        bigquery_client.query(query).result()
+    finally:
+        # Don't leave staging tables behind when a load or the join fails
+        bigquery_client.delete_table(f"{dataset_id}.{processed_table}", not_found_ok=True)
+        bigquery_client.delete_table(f"{dataset_id}.{failed_table}", not_found_ok=True)
+    print(f"✓ Successfully wrote consolidated results to {enriched_table_id}")
     
     # Print sample of final data
     print("\nSample of final merged data:")
-    sample_completed = merged_df[merged_df['processing_status'] == 'completed'].head()
+    display_columns = ['id', 'name', 'brand', 'image_uri', 'description', 'completed_at', 'processing_status']
+    sample_completed = bigquery_client.query(f"""
+    SELECT {', '.join(display_columns)}
+    FROM `{enriched_table_id}`
+    WHERE processing_status = 'completed'
+    LIMIT 5
+    """).to_dataframe(create_bqstorage_client=False)
     if not sample_completed.empty:
         print("\nCompleted products sample:")
-        display_columns = ['id', 'name', 'brand', 'image_uri', 'description', 'completed_at', 'processing_status']
-        print(sample_completed[display_columns])
+        print(sample_completed)
     
     # Generate timestamp for filename
     timestamp = int(time.time())
     filename = f"consolidated_products_{timestamp}.csv"
     
-    # Upload to GCS
-    upload_to_gcs(merged_df, filename)
-    
-    # Write to BigQuery
-    write_to_bigquery(merged_df, ENRICHED_TABLE)
+    # Export the CSV report straight from the table
+    extract_job = bigquery_client.extract_table(
+        enriched_table_id,
+        f"gs://{IMG_BUCKET}/exports/{filename}",
+        job_config=bigquery.ExtractJobConfig(destination_format=bigquery.DestinationFormat.CSV),
+    )
+    extract_job.result()
+    print(f"Uploaded consolidated results to gs://{IMG_BUCKET}/exports/{filename}")
     
     # Print summary
+    summary = next(iter(bigquery_client.query(f"""
+    SELECT
+      COUNT(*) AS total,
+      COUNTIF(processing_status = 'completed') AS completed,
+      COUNTIF(processing_status = 'failed') AS failed,
+      COUNTIF(processing_status = 'pending') AS pending
+    FROM `{enriched_table_id}`
+    """).result()))
     print("\nProcessing Summary:")
-    print(f"Total Products: {len(merged_df)}")
-    print(f"Completed: {len(merged_df[merged_df['processing_status'] == 'completed'])}")
-    print(f"Failed: {len(merged_df[merged_df['processing_status'] == 'failed'])}")
-    print(f"Pending: {len(merged_df[merged_df['processing_status'] == 'pending'])}")
+    print(f"Total Products: {summary.total}")
+    print(f"Completed: {summary.completed}")
+    print(f"Failed: {summary.failed}")
+    print(f"Pending: {summary.pending}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv('log_level', 'INFO'))
     consolidate_results() 
\ No newline at end of file
@@ -15,12 +15,77 @@
 
 from google.cloud import firestore
 from datetime import datetime
+import threading
 from google.api_core.exceptions import FailedPrecondition
 
+# Default for callers that have not already read the product's document
+_NOT_FETCHED = object()
+
+# Attempts per queued write before a BulkWriter gives up on it (the library default)
+BULK_WRITE_MAX_ATTEMPTS = 15
+
 class FirestoreClient:
     def __init__(self, project_id, collection_name):
         self.db = firestore.Client(project=project_id)
         self.collection = self.db.collection(collection_name)
+        # Worker threads share one BulkWriter per batch
+        self._writer_lock = threading.Lock()
+        # Ids known to be finished, so they can be skipped without a read
+        self._done_ids = set()
+        # Queued final-status writes by document path, as (product_id, status)
+        self._pending_writes = {}
+        self._pending_lock = threading.Lock()
+    
+    def bulk_writer(self):
+        """Create a BulkWriter for coalescing a batch's status updates into few commits."""
+        writer = self.db.bulk_writer()
+        writer.on_write_result(self._on_bulk_write_result)
+        writer.on_write_error(self._on_bulk_write_error)
+        return writer
+    
+    def _update(self, doc_ref, data, writer, product_id=None):
+        """Update a document directly, or queue the update on writer if one is given.
+        
+        When product_id is given and the new status is final, the product joins
+        the in-process skip set once the write has been committed.
+        """
+        if writer is None:
+            doc_ref.update(data)
+            if product_id is not None:
+                self._mark_done(product_id, data['status'])
+        else:
+            if product_id is not None:
+                # Registered first, since the result can arrive on another thread
+                with self._pending_lock:
+                    self._pending_writes[doc_ref.path] = (product_id, data['status'])
+            with self._writer_lock:
+                writer.update(doc_ref, data)
+    
+    def _mark_done(self, product_id, status):
+        """Add a product to the skip set if status is a final one."""
+        if status in ('completed', 'permanently_failed'):
+            self._done_ids.add(int(product_id))
+    
+    def _on_bulk_write_result(self, reference, result, bulk_writer):
+        """Record a committed final-status write."""
+        with self._pending_lock:
+            pending = self._pending_writes.pop(reference.path, None)
+        if pending is not None:
+            self._mark_done(*pending)
+    
+    def _on_bulk_write_error(self, failure, bulk_writer):
+        """Retry a failed queued write, and mark the product failed once retries run out."""
+        if failure.attempts < BULK_WRITE_MAX_ATTEMPTS:
+            return True
+        
+        reference = failure.operation.reference
+        print(f"Failed to write {reference.path}: {failure.message}")
+        with self._pending_lock:
+            pending = self._pending_writes.pop(reference.path, None)
+        if pending is not None and pending[1] == 'completed':
+            # Same outcome as a completion write that raises without a writer
+            self.mark_product_failed(pending[0], f"Error processing product: {failure.message}")
+        return False
     
     def get_last_processed_id(self):
         """Get the last processed ID from Firestore."""
@@ -39,16 +104,50 @@ class FirestoreClient:
             'last_updated': firestore.SERVER_TIMESTAMP
         })
     
+    def load_done_ids(self):
+        """Seed the in-process skip set with one id-only query for finished products."""
+        docs = (
+            self.collection
+            .where(filter=firestore.FieldFilter('status', 'in', ['completed', 'permanently_failed']))
+            .select([])
+            .stream()
+        )
+        self._done_ids.update(int(doc.id) for doc in docs)
+        return len(self._done_ids)
+    
+    def is_known_processed(self, product_id):
+        """Check the in-process skip set, without a Firestore read."""
+        return product_id in self._done_ids
+    
+    def get_statuses(self, product_ids):
+        """Fetch the processing documents of many products in one round trip."""
+        doc_refs = [self.collection.document(str(product_id)) for product_id in product_ids]
+        return {
+            int(doc.id): doc.to_dict()
+            for doc in self.db.get_all(doc_refs)
+            if doc.exists
+        }
+    
+    @staticmethod
+    def is_processed(data):
+        """Check if a processing document (or None) marks the product as done."""
+        if data is None:
+            return False
+        status = data.get('status')
+        retry_count = data.get('retry_count', 0)
+        # Return True if completed or failed too many times
+        return status == 'completed' or retry_count >= 3
+    
     def is_product_processed(self, product_id):
         """Check if a product has already been processed successfully."""
+        if self.is_known_processed(product_id):
+            return True
         doc_ref = self.collection.document(str(product_id))
         doc = doc_ref.get()
-        if doc.exists:
-            status = doc.to_dict().get('status')
-            retry_count = doc.to_dict().get('retry_count', 0)
-            # Return True if completed or failed too many times
-            return status == 'completed' or retry_count >= 3
-        return False
+        processed = self.is_processed(doc.to_dict() if doc.exists else None)
+        if processed:
+            self._done_ids.add(int(product_id))
+        return processed
     
     def get_failed_products(self):
         """Get list of products that failed and haven't exceeded retry limit."""
@@ -57,6 +156,8 @@ class FirestoreClient:
             failed_docs = (
                 self.collection
                 .where(filter=firestore.FieldFilter('status', '==', 'failed'))
+                # A retry only needs the product row and its retry count
+                .select(['product_data', 'retry_count'])
                 .stream()
             )
             
@@ -75,21 +176,27 @@ class FirestoreClient:
             
         except FailedPrecondition as e:
             print("\nFirestore index error. Please create the following indexes:")
-            print("1. Collection: product_index")
+            print(f"1. Collection: {self.collection.id}")
             print("2. Fields to index:")
             print("   - status (Ascending)")
             print("   - retry_count (Ascending)")
             print("   - __name__ (Ascending)")
             print("\nYou can create the index using the Firebase Console or using the following command:")
-            print("gcloud firestore indexes composite create --collection-group=product_index --field-config field=status,order=ASCENDING field=retry_count,order=ASCENDING field=__name__,order=ASCENDING")
+            print(f"gcloud firestore indexes composite create --collection-group={self.collection.id} --field-config=field-path=status,order=ascending --field-config=field-path=retry_count,order=ascending")
             print("\nOr visit the following URL to create the index:")
             print("https://console.firebase.google.com/project/psearch-dev/firestore/indexes")
             return []
     
-    def start_product_processing(self, product_id, product_data):
-        """Mark a product as being processed."""
+    def start_product_processing(self, product_id, product_data, existing_data=_NOT_FETCHED):
+        """Mark a product as being processed and return its retry count.
+        
+        existing_data is the product's current document (None if there is none),
+        when the caller already fetched it, e.g. through get_statuses.
+        """
         doc_ref = self.collection.document(str(product_id))
-        doc = doc_ref.get()
+        if existing_data is _NOT_FETCHED:
+            doc = doc_ref.get()
+            existing_data = doc.to_dict() if doc.exists else None
         
         data = {
             'status': 'processing',
@@ -100,27 +207,35 @@ class FirestoreClient:
         }
         
         # If document exists, increment retry count
-        if doc.exists:
-            current_retry = doc.to_dict().get('retry_count', 0)
+        if existing_data is not None:
+            current_retry = existing_data.get('retry_count', 0)
             data['retry_count'] = current_retry + 1
         
         doc_ref.set(data)
+        return data['retry_count']
     
-    def complete_product_processing(self, product_id, image_uri, description):
+    def complete_product_processing(self, product_id, image_uri, description, writer=None):
         """Mark a product as completed with generated data."""
         doc_ref = self.collection.document(str(product_id))
-        doc_ref.update({
+        self._update(doc_ref, {
             'status': 'completed',
             'image_uri': image_uri,
             'description': description,
             'completed_at': firestore.SERVER_TIMESTAMP,
             'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        }, writer, product_id)
     
-    def mark_product_failed(self, product_id, error_message):
-        """Mark a product as failed with error details."""
+    def mark_product_failed(self, product_id, error_message, retry_count=None, writer=None):
+        """Mark a product as failed with error details.
+        
+        retry_count can be passed when known (as returned by
+        start_product_processing) to skip reading the document again.
+        """
         doc_ref = self.collection.document(str(product_id))
-        doc = doc_ref.get()
+        if retry_count is None:
+            doc = doc_ref.get()
+            if doc.exists:
+                retry_count = doc.to_dict().get('retry_count', 0)
         
         update_data = {
             'status': 'failed',
@@ -129,12 +244,12 @@ class FirestoreClient:
             'updated_at': firestore.SERVER_TIMESTAMP
         }
         
-        if doc.exists:
-            retry_count = doc.to_dict().get('retry_count', 0)
+        if retry_count is not None:
             update_data['retry_count'] = retry_count
             
             # If we've tried 3 times, mark as permanently failed
             if retry_count >= 3:
                 update_data['status'] = 'permanently_failed'
         
-        doc_ref.update(update_data) 
\ No newline at end of file
+        # Without a retry count the document may not exist, so let that surface here
+        self._update(doc_ref, update_data, writer if retry_count is not None else None, product_id) 
\ No newline at end of file
@@ -13,44 +13,73 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import os
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, SafetySetting
+from quota_retry import retry_on_quota
+
+GENERATION_CONFIG = {
+    "max_output_tokens": 8192,
+    "temperature": 0.2,
+    "top_p": 0.95,
+}
+
+SAFETY_SETTINGS = [
+    SafetySetting(
+        category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+        threshold=SafetySetting.HarmBlockThreshold.OFF
+    ),
+    SafetySetting(
+        category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+        threshold=SafetySetting.HarmBlockThreshold.OFF
+    ),
+    SafetySetting(
+        category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+        threshold=SafetySetting.HarmBlockThreshold.OFF
+    ),
+    SafetySetting(
+        category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
+        threshold=SafetySetting.HarmBlockThreshold.OFF
+    ),
+]
+
+# Filled in per product with str.format
+DESCRIPTION_PROMPT = """Analyze this {brand_name} product image and provide a compelling e-commerce pharmacy description that includes:
+1. Product name: {product_name}
+2. Brand highlights: Emphasize {brand_name}'s reputation and quality in the {category} category
+3. Key product features and specifications
+4. Materials and construction quality
+5. Colors and design elements
+6. Size and dimensions (if visible)
+7. Unique selling points and value proposition (considering the retail price of ${retail_price})
+8. Target audience or use cases
+9. Any visible brand elements or distinctive features
+
+Focus on creating persuasive content that highlights the {brand_name} brand value and helps shoppers make a confident purchase decision."""
 
 def init_gemini(project_id):
     """Initialize Gemini client."""
     vertexai.init(project=project_id, location="us-central1")
 
+@functools.lru_cache(maxsize=None)
+def get_model(project_id):
+    """Initialize Vertex AI once per project and return the shared Gemini model."""
+    init_gemini(project_id)
+    return GenerativeModel("gemini-1.5-flash-001")
+
+@retry_on_quota
+def _generate_content(model, contents, generation_config, safety_settings):
+    """Call Gemini, retrying with backoff when the quota is exhausted."""
+    return model.generate_content(
+        contents,
+        generation_config=generation_config,
+        safety_settings=safety_settings,
+    )
+
 def get_image_description(image_bytes, project_id, product_data):
     """Generate image description using Vertex AI Gemini Flash."""
-    init_gemini(project_id)
-    
-    model = GenerativeModel("gemini-1.5-flash-001")
-    
-    generation_config = {
-        "max_output_tokens": 8192,
-        "temperature": 0.2,
-        "top_p": 0.95,
-    }
-    
-    safety_settings = [
-        SafetySetting(
-            category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-            threshold=SafetySetting.HarmBlockThreshold.OFF
-        ),
-        SafetySetting(
-            category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-            threshold=SafetySetting.HarmBlockThreshold.OFF
-        ),
-        SafetySetting(
-            category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-            threshold=SafetySetting.HarmBlockThreshold.OFF
-        ),
-        SafetySetting(
-            category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-            threshold=SafetySetting.HarmBlockThreshold.OFF
-        ),
-    ]
+    model = get_model(project_id)
     
     try:
         image_part = Part.from_data(data=image_bytes, mime_type="image/png")
@@ -59,23 +88,18 @@ def get_image_description(image_bytes, project_id, product_data):
         category = product_data.get('category', '')
         retail_price = product_data.get('retail_price', '')
         
-        prompt = f"""Analyze this {brand_name} product image and provide a compelling e-commerce pharmacy description that includes:
-1. Product name: {product_name}
-2. Brand highlights: Emphasize {brand_name}'s reputation and quality in the {category} category
-3. Key product features and specifications
-4. Materials and construction quality
-5. Colors and design elements
-6. Size and dimensions (if visible)
-7. Unique selling points and value proposition (considering the retail price of ${retail_price})
-8. Target audience or use cases
-9. Any visible brand elements or distinctive features
-
-Focus on creating persuasive content that highlights the {brand_name} brand value and helps shoppers make a confident purchase decision."""
+        prompt = DESCRIPTION_PROMPT.format(
+            brand_name=brand_name,
+            product_name=product_name,
+            category=category,
+            retail_price=retail_price,
+        )
         
-        response = model.generate_content(
+        response = _generate_content(
+            model,
             [prompt, image_part],
-            generation_config=generation_config,
-            safety_settings=safety_settings,
+            GENERATION_CONFIG,
+            SAFETY_SETTINGS,
         )
         
         return response.text
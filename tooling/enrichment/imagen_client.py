@@ -13,37 +13,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import os
 import vertexai
 from vertexai.preview.vision_models import ImageGenerationModel
+from quota_retry import retry_on_quota
+
+# Filled in per product with str.format
+IMAGE_PROMPT = """Create a professional product image for an e-commerce listing:
+Product: {name}
+Brand: {brand}
+Category: {category} in {department} department
+Style: Clean, well-lit product photography style with white background
+Focus: Show the product clearly with attention to detail and key features"""
 
 def init_imagen(project_id):
     """Initialize Imagen client."""
     vertexai.init(project=project_id, location="us-central1")
 
+@functools.lru_cache(maxsize=None)
+def get_model(project_id):
+    """Initialize Vertex AI once per project and return the shared Imagen model."""
+    init_imagen(project_id)
+    return ImageGenerationModel.from_pretrained("imagen-3.0-generate-002")
+
+@retry_on_quota
+def _generate_images(model, prompt):
+    """Call Imagen, retrying with backoff when the quota is exhausted."""
+    return model.generate_images(
+        prompt=prompt,
+        number_of_images=1,
+        language="en",
+        aspect_ratio="1:1",
+        safety_filter_level="block_some",
+        person_generation="allow_adult",
+    )
+
 def generate_image(row_data, project_id):
     """Generate image based on product data using Vertex AI Imagen."""
-    init_imagen(project_id)
-    
     # Create a more detailed prompt with specific product attributes
-    prompt = f"""Create a professional product image for an e-commerce listing:
-Product: {row_data['name']}
-Brand: {row_data['brand']}
-Category: {row_data['category']} in {row_data['department']} department
-Style: Clean, well-lit product photography style with white background
-Focus: Show the product clearly with attention to detail and key features"""
+    prompt = IMAGE_PROMPT.format(
+        name=row_data['name'],
+        brand=row_data['brand'],
+        category=row_data['category'],
+        department=row_data['department'],
+    )
 
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-002")
+    model = get_model(project_id)
     
     try:
-        images = model.generate_images(
-            prompt=prompt,
-            number_of_images=1,
-            language="en",
-            aspect_ratio="1:1",
-            safety_filter_level="block_some",
-            person_generation="allow_adult",
-        )
+        images = _generate_images(model, prompt)
         
         if not images:
             print(f"No images generated for product: {row_data['name']}")
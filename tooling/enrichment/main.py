@@ -15,7 +15,10 @@
 
 from google.cloud import bigquery, storage
 import pandas as pd
+import requests
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import time
 from imagen_client import generate_image
@@ -30,12 +33,30 @@ PROJECT_ID = os.getenv('project_id')
 DATASET = os.getenv('bq_dataset')
 TABLE = os.getenv('bq_table')
 FIRESTORE_COLLECTION = os.getenv('firestore_collection')
+IMG_BUCKET = os.getenv('psearch_img_bucket')
 BATCH_SIZE = 50  # Process 50 rows at a time
+# Products enriched concurrently; Vertex AI quota errors are retried with backoff
+MAX_WORKERS = int(os.getenv('max_workers', '16'))
+
+# Per-product detail is only emitted at DEBUG level (log_level=DEBUG)
+logger = logging.getLogger(__name__)
 
 # Initialize Firestore client
 firestore_client = FirestoreClient(PROJECT_ID, FIRESTORE_COLLECTION)
 
-def fetch_bigquery_data(last_processed_id):
+# Shared Cloud Storage client, so uploads reuse its authorized connection pool
+storage_client = storage.Client()
+# The default pool keeps 10 connections; size it so every upload thread keeps one alive
+storage_client._http.mount(
+    "https://", requests.adapters.HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+)
+img_bucket = storage_client.bucket(IMG_BUCKET)
+
+# Image uploads run here, alongside the Gemini call that describes the same image
+upload_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+def fetch_bigquery_batches(last_processed_id):
+    """Scan the products after last_processed_id with one query, yielding BATCH_SIZE-row DataFrames."""
     client = bigquery.Client(project=PROJECT_ID)
     
     query = f"""
@@ -43,131 +64,166 @@ def fetch_bigquery_data(last_processed_id):
     FROM `{PROJECT_ID}.{DATASET}.{TABLE}`
     WHERE id > {last_processed_id}
     ORDER BY id
-    LIMIT {BATCH_SIZE}
     """
     
     try:
-        df = client.query(query).to_dataframe()
-        print(f"\nProcessing {len(df)} rows starting from ID: {last_processed_id}")
-        return df
+        # Later batches are fetched page by page from the same job's results
+        rows = client.query(query).result(page_size=BATCH_SIZE)
+        for df in rows.to_dataframe_iterable():
+            print(f"\nProcessing {len(df)} rows starting from ID: {df['id'].iloc[0]}")
+            yield df
     except Exception as e:
         print(f"Error occurred: {str(e)}")
-        return None
 
 def upload_to_gcs(image, filename):
     """Upload generated image to Google Cloud Storage bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(os.getenv('psearch_img_bucket'))
-    blob = bucket.blob(filename)
-    blob.upload_from_string(image._image_bytes)
-    return f"gs://{os.getenv('psearch_img_bucket')}/{filename}"
+    blob = img_bucket.blob(filename)
+    blob.upload_from_string(image._image_bytes, content_type="image/png")
+    return f"gs://{IMG_BUCKET}/{filename}"
 
-def process_single_product(row):
-    """Process a single product and return the result."""
-    product_id = row['id']
-    row_data = row.to_dict()
+def process_single_product(row_data, existing_data=None, writer=None):
+    """Process a single product, given as a dict of its BigQuery row, and return the result.
+    
+    existing_data is the product's current Firestore document, or None if it has none.
+    Final status updates are queued on writer, a Firestore BulkWriter, when given.
+    """
+    product_id = row_data['id']
+    retry_count = None
     
     try:
         # Start processing and mark in Firestore
-        firestore_client.start_product_processing(product_id, row_data)
+        retry_count = firestore_client.start_product_processing(product_id, row_data, existing_data)
         
         # Generate safe filename using product ID
         safe_filename = f"product_{product_id}.png"
         
         # Generate image using Imagen client
-        image = generate_image(row, PROJECT_ID)
+        image = generate_image(row_data, PROJECT_ID)
         if not image:
             raise Exception("Failed to generate image")
             
+        # Upload to GCS while Gemini describes the image; both only need the image bytes
+        upload_future = upload_executor.submit(upload_to_gcs, image, safe_filename)
+        
         # Get image description using Gemini client - Updated to pass product_data
         description = get_image_description(image._image_bytes, PROJECT_ID, row_data)
         if not description:
             raise Exception("Failed to generate description")
         
-        # Upload to GCS and get URI
-        image_uri = upload_to_gcs(image, safe_filename)
+        # Get the URI once the upload finishes
+        image_uri = upload_future.result()
         
         # Mark as completed in Firestore
-        firestore_client.complete_product_processing(product_id, image_uri, description)
+        firestore_client.complete_product_processing(product_id, image_uri, description, writer)
         
         # Add to processed rows for CSV
         row_data['image_uri'] = image_uri
         row_data['description'] = description
         
         print(f"Generated and uploaded image for product ID {product_id}: {image_uri}")
-        print(f"Generated description: {description[:100]}...")
+        logger.debug("Generated description: %.100s...", description)
         
         return row_data, None
         
     except Exception as e:
         error_message = f"Error processing product: {str(e)}"
         print(error_message)
-        firestore_client.mark_product_failed(product_id, error_message)
+        firestore_client.mark_product_failed(product_id, error_message, retry_count, writer)
         return None, error_message
 
+def process_concurrently(executor, rows):
+    """Process (row_data, existing_data) pairs on the worker pool and return the successful results."""
+    # Coalesce the batch's final status updates into a few Firestore commits
+    writer = firestore_client.bulk_writer()
+    futures = [
+        executor.submit(process_single_product, row_data, existing_data, writer)
+        for row_data, existing_data in rows
+    ]
+    results = []
+    for future in as_completed(futures):
+        result, error = future.result()
+        if result:
+            results.append(result)
+    
+    # Wait for the queued updates before the batch counts as done
+    writer.close()
+    # A product whose completion write failed was marked failed instead
+    return [result for result in results if firestore_client.is_known_processed(result['id'])]
+
 def process_products():
     processed_rows = []
     total_processed = 0
     last_id = firestore_client.get_last_processed_id()
     
-    # First, try to process any previously failed items
-    print("Checking for failed products to retry...")
-    failed_products = firestore_client.get_failed_products()
-    for failed_product in failed_products:
-        product_data = failed_product['product_data']
-        row = pd.Series(product_data)
-        
-        result, error = process_single_product(row)
-        if result:
-            processed_rows.append(result)
-            total_processed += 1
-        
-        time.sleep(1)  # Rate limiting
+    # Finished products are skipped from memory instead of re-reading their documents
+    done_count = firestore_client.load_done_ids()
+    print(f"Found {done_count} already processed products")
     
-    # Now process new items
-    while total_processed < 30000:
-        df = fetch_bigquery_data(last_id)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # First, try to process any previously failed items
+        print("Checking for failed products to retry...")
+        failed_products = firestore_client.get_failed_products()
+        results = process_concurrently(
+            executor,
+            [
+                (failed_product['product_data'], failed_product)
+                for failed_product in failed_products
+            ],
+        )
+        processed_rows.extend(results)
+        total_processed += len(results)
         
-        if df is None or df.empty:
-            print("No more rows to process")
-            break
+        # Now process new items
+        for df in fetch_bigquery_batches(last_id):
+            if total_processed >= 30000:
+                break
             
-        for index, row in df.iterrows():
-            product_id = row['id']
+            # One Firestore round trip for the status of the rest of the batch
+            unknown_ids = [
+                product_id for product_id in df['id'].tolist()
+                if not firestore_client.is_known_processed(product_id)
+            ]
+            statuses = firestore_client.get_statuses(unknown_ids) if unknown_ids else {}
             
-            # Skip if product already processed
-            if firestore_client.is_product_processed(product_id):
-                print(f"Product {product_id} already processed, skipping...")
-                last_id = product_id
-                continue
+            pending_rows = []
+            # Plain dicts per row; iterrows would build a Series for each one
+            for row_data in df.to_dict(orient='records'):
+                product_id = row_data['id']
+                existing_data = statuses.get(product_id)
+                
+                # Skip if product already processed
+                if firestore_client.is_known_processed(product_id) or firestore_client.is_processed(existing_data):
+                    print(f"Product {product_id} already processed, skipping...")
+                    continue
+                
+                pending_rows.append((row_data, existing_data))
             
-            result, error = process_single_product(row)
-            if result:
-                processed_rows.append(result)
-                total_processed += 1
+            results = process_concurrently(executor, pending_rows)
+            processed_rows.extend(results)
+            total_processed += len(results)
             
-            # Update last processed ID
-            last_id = product_id
+            # Every row of the batch has been attempted; failures are retried from Firestore
+            last_id = int(df['id'].max())
             firestore_client.update_last_processed_id(last_id)
             
-            # Add some delay to avoid rate limiting
-            time.sleep(1)
-        
-        print(f"Processed {total_processed} products so far")
+            print(f"Processed {total_processed} products so far")
+        else:
+            print("No more rows to process")
     
     # Create final DataFrame and export to CSV
     if processed_rows:
         final_df = pd.DataFrame(processed_rows)
         output_filename = f"processed_products_{int(time.time())}.csv"
-        final_df.to_csv(output_filename, index=False)
+        csv_data = final_df.to_csv(index=False)
+        with open(output_filename, 'w') as f:
+            f.write(csv_data)
         print(f"Exported results to {output_filename}")
         
-        # Upload CSV to GCS
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(os.getenv('psearch_img_bucket'))
-        blob = bucket.blob(f"exports/{output_filename}")
-        blob.upload_from_filename(output_filename)
-        print(f"Uploaded CSV to gs://{os.getenv('psearch_img_bucket')}/exports/{output_filename}")
+        # Upload the CSV from memory rather than reading the file back
+        blob = img_bucket.blob(f"exports/{output_filename}")
+        blob.upload_from_string(csv_data, content_type="text/csv")
+        print(f"Uploaded CSV to gs://{IMG_BUCKET}/exports/{output_filename}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv('log_level', 'INFO'))
     process_products()
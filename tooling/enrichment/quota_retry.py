@@ -0,0 +1,51 @@
+# 
+# Copyright 2025 Google LLC
+# 
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# 
+#     https://www.apache.org/licenses/LICENSE-2.0
+# 
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from google.api_core.exceptions import (
+    DeadlineExceeded,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random,
+    wait_random_exponential,
+)
+
+
+def _log_retry(retry_state):
+    """Report each backoff so retry tuning can be checked against real runs"""
+    print(
+        f"{type(retry_state.outcome.exception()).__name__} from "
+        f"{retry_state.fn.__name__}, retry {retry_state.attempt_number} "
+        f"in {retry_state.next_action.sleep:.1f}s"
+    )
+
+
+# Back off only when Vertex AI throttles or is briefly unavailable, instead of
+# sleeping between every product whether or not the API is throttling us.
+# The randomized wait keeps concurrent workers that hit a 429 together from
+# retrying in lockstep and colliding again.
+retry_on_quota = retry(
+    retry=retry_if_exception_type(
+        (ResourceExhausted, ServiceUnavailable, DeadlineExceeded)
+    ),
+    wait=wait_random_exponential(multiplier=1, max=10) + wait_random(0, 0.5),
+    stop=stop_after_attempt(8),
+    before_sleep=_log_retry,
+    reraise=True,
+)